@@ -0,0 +1,92 @@
+import re
+from collections import namedtuple
+
+# numpy is imported inside the functions so that importing this module
+# (e.g. from document_analyzer) stays cheap.
+
+# Rupee amounts found in a text: parallel NumPy arrays of values in rupees
+# and the [start, end) offsets each value was read from, in text order.
+Amounts = namedtuple('Amounts', ['values', 'starts', 'ends'])
+
+RUPEES_PER_UNIT = {'lakh': 100000, 'lac': 100000, 'crore': 10000000, 'cr': 10000000}
+
+_CURRENCY = r'(?:Rs\.?|INR|₹)'
+# Indian ("5,00,000") or western ("500,000") grouping, or plain digits
+_NUMBER = r'\d{1,3}(?:,\d{2,3})+(?:\.\d+)?|\d+(?:\.\d+)?'
+_UNIT = r'lakhs?|lacs?|crores?|cr'
+
+# A figure is an amount when it has a currency marker, a unit, digit
+# grouping or the "/-" suffix. In a range ("5 to 10 lakhs", "Rs. 1,00,000 -
+# 5,00,000") both ends are amounts and share a unit given only once.
+_AMOUNT = re.compile(
+    rf'(?:(?P<currency>{_CURRENCY})\s*)?(?<![\d,])(?P<low>{_NUMBER})(?:\s*(?P<low_unit>{_UNIT})\b)?'
+    rf'(?:(?:\s*[-–]\s*|\s+to\s+)(?:{_CURRENCY}\s*)?(?P<high>{_NUMBER})(?:\s*(?P<high_unit>{_UNIT})\b)?)?'
+    r'(?P<suffix>\s*/-)?',
+    re.IGNORECASE
+)
+
+
+def _unit_multipliers(np, units):
+    """Return rupees per unit for an array of unit words ("" for none)."""
+    units = np.char.lower(units)
+    multipliers = np.ones(len(units))
+    for unit, rupees in RUPEES_PER_UNIT.items():
+        multipliers[np.char.startswith(units, unit)] = rupees
+    return multipliers
+
+
+def parse_amounts(strings):
+    """Return a NumPy array of the rupee values of amount strings such as
+    "5,00,000", "2.5 lakh" or "Rs. 1 crore"; NaN where a string holds no
+    number."""
+    import numpy as np
+
+    numbers = []
+    units = []
+    for string in strings:
+        match = _AMOUNT.search(string)
+        numbers.append(match.group('low') if match else 'nan')
+        units.append((match.group('low_unit') or match.group('high_unit') or '') if match else '')
+    if not numbers:
+        return np.empty(0)
+    values = np.char.replace(np.array(numbers), ',', '').astype(float)
+    return values * _unit_multipliers(np, np.array(units))
+
+
+def find_amounts(text):
+    """Return the rupee amounts in text as Amounts arrays.
+
+    Every match of the amount pattern is collected in one scan, skipping
+    bare numbers (days, ages, clause numbers); converting the figures and
+    applying lakh and crore units is then done on whole arrays.
+    """
+    import numpy as np
+
+    numbers = []
+    units = []
+    starts = []
+    ends = []
+    for match in _AMOUNT.finditer(text):
+        low_unit = match.group('low_unit') or ''
+        high = match.group('high')
+        high_unit = match.group('high_unit') or ''
+        if not (match.group('currency') or low_unit or high_unit or match.group('suffix')
+                or ',' in match.group('low') or (high and ',' in high)):
+            continue
+
+        numbers.append(match.group('low'))
+        units.append(low_unit or high_unit)
+        starts.append(match.start())
+        ends.append(match.end('low_unit') if low_unit else match.end('low'))
+        if high:
+            numbers.append(high)
+            units.append(high_unit or low_unit)
+            starts.append(match.start('high'))
+            ends.append(match.end())
+
+    if not numbers:
+        return Amounts(np.empty(0), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+
+    values = np.char.replace(np.array(numbers), ',', '').astype(float)
+    values *= _unit_multipliers(np, np.array(units))
+    return Amounts(values, np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64))
@@ -1,15 +1,44 @@
-from flask import Flask, jsonify, request
-from enhanced_analyzer import extract_text_from_pdf, save_simplified_text
+from flask import Flask, Request, Response, g, jsonify, request, stream_with_context
+from enhanced_analyzer import (analyze_pdf, build_summary, normalize_sections, render_analysis_report,
+                               render_summary, ANALYZER_VERSION)
+from result_cache import ResultCache, hash_bytes, hash_file
+from corpus_index import CorpusIndex
+from comparison import MAX_COMPARED_DOCUMENTS, compare_profiles, profile_from_index, profile_from_result
+from jobs import JobQueue, QueueFullError
+from metrics import Registry, StageTimer
+from visualizations import CHART_VERSION, build_figure_specs, chart_data
 import os
-from werkzeug.utils import secure_filename
 import logging
+import re
+import sqlite3
 import tempfile
+import io
+import json
+import zipfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class UploadRequest(Request):
+    """Request that parses small uploads straight into memory.
+
+    Requests up to UPLOAD_SPOOL_THRESHOLD bytes are parsed into a BytesIO.
+    Larger ones are spooled to a uniquely named temp file, which is deleted
+    when the request ends. Either way the upload is written at most once.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and total_content_length <= app.config['UPLOAD_SPOOL_THRESHOLD']:
+            return io.BytesIO()
+        return tempfile.NamedTemporaryFile(suffix='.pdf', dir=app.config['UPLOAD_FOLDER'])
+
 app = Flask(__name__)
+app.request_class = UploadRequest
+# Keep structured results in document order rather than sorting their keys
+app.json.sort_keys = False
 
 # Configure upload folder using tempfile for better cross-platform compatibility
 UPLOAD_FOLDER = tempfile.gettempdir()
@@ -17,28 +46,348 @@ ALLOWED_EXTENSIONS = {'pdf'}
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# Uploads up to this size are processed from memory without touching disk
+app.config['UPLOAD_SPOOL_THRESHOLD'] = int(os.environ.get('UPLOAD_SPOOL_THRESHOLD', 4 * 1024 * 1024))
+
+# Result cache keyed by the hash of the uploaded bytes. Set RESULT_CACHE_DIR
+# to also keep results on disk across worker restarts. Disk entries unused
+# for RESULT_CACHE_MAX_AGE seconds are removed (0 keeps them forever).
+app.config['RESULT_CACHE_SIZE'] = int(os.environ.get('RESULT_CACHE_SIZE', 128))
+app.config['RESULT_CACHE_DIR'] = os.environ.get('RESULT_CACHE_DIR')
+app.config['RESULT_CACHE_MAX_AGE'] = int(os.environ.get('RESULT_CACHE_MAX_AGE', 7 * 24 * 3600))
+
+result_cache = ResultCache(
+    max_entries=app.config['RESULT_CACHE_SIZE'],
+    cache_dir=app.config['RESULT_CACHE_DIR'],
+    max_disk_age=app.config['RESULT_CACHE_MAX_AGE']
+)
+
+# Chart specs of each document for /api/visualizations, keyed by its
+# document_id. Kept on disk next to the results when RESULT_CACHE_DIR is set.
+app.config['CHART_CACHE_SIZE'] = int(os.environ.get('CHART_CACHE_SIZE', 128))
+
+chart_cache = ResultCache(
+    max_entries=app.config['CHART_CACHE_SIZE'],
+    cache_dir=app.config['RESULT_CACHE_DIR'],
+    max_disk_age=app.config['RESULT_CACHE_MAX_AGE']
+)
+
+# Page cache keyed by a hash of each page's content stream, so a republished
+# document with a few changed pages only has those pages extracted and
+# analyzed again. PAGE_CACHE_DIR and PAGE_CACHE_MAX_AGE configure the disk
+# tier as above.
+app.config['PAGE_CACHE_SIZE'] = int(os.environ.get('PAGE_CACHE_SIZE', 2000))
+app.config['PAGE_CACHE_DIR'] = os.environ.get('PAGE_CACHE_DIR')
+app.config['PAGE_CACHE_MAX_AGE'] = int(os.environ.get('PAGE_CACHE_MAX_AGE', 7 * 24 * 3600))
+
+page_cache = ResultCache(
+    max_entries=app.config['PAGE_CACHE_SIZE'],
+    cache_dir=app.config['PAGE_CACHE_DIR'],
+    max_disk_age=app.config['PAGE_CACHE_MAX_AGE']
+)
+
+# Searchable index of every processed document, kept in a SQLite file that
+# all workers share and created on first use. Set CORPUS_INDEX_PATH to an
+# empty value to disable it.
+app.config['CORPUS_INDEX_PATH'] = os.environ.get('CORPUS_INDEX_PATH', 'corpus_index.db')
+
+corpus_index = CorpusIndex(app.config['CORPUS_INDEX_PATH']) if app.config['CORPUS_INDEX_PATH'] else None
+
+# Background job processing for /api/jobs. Submissions beyond the queue
+# size are rejected with 429 until workers catch up.
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))
+app.config['JOB_QUEUE_SIZE'] = int(os.environ.get('JOB_QUEUE_SIZE', 16))
+
+# Batch uploads are processed concurrently on a pool shared by all batch
+# requests of this worker.
+app.config['BATCH_WORKERS'] = int(os.environ.get('BATCH_WORKERS', 4))
+app.config['BATCH_MAX_FILES'] = int(os.environ.get('BATCH_MAX_FILES', 50))
+# Total uncompressed size of the PDFs taken from zip archives in one batch
+app.config['BATCH_MAX_UNZIPPED_BYTES'] = int(os.environ.get('BATCH_MAX_UNZIPPED_BYTES', 256 * 1024 * 1024))
+
+batch_pool = ThreadPoolExecutor(max_workers=app.config['BATCH_WORKERS'],
+                                thread_name_prefix='batch-worker')
+
+# Metrics exported on /metrics. Each worker process keeps its own values.
+metrics = Registry()
+STAGE_SECONDS = metrics.histogram(
+    'policy_stage_seconds', 'Time spent in each processing stage.', labels=('stage',))
+PAGE_SECONDS = metrics.histogram(
+    'policy_page_extraction_seconds', 'Time to extract the text of one PDF page not in the page cache.',
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+DOCUMENT_PAGES = metrics.histogram(
+    'policy_document_pages', 'Pages per processed PDF.',
+    buckets=(1, 5, 10, 25, 50, 100, 200, 500, 1000))
+DOCUMENT_BYTES = metrics.histogram(
+    'policy_document_bytes', 'Size of processed PDFs in bytes.',
+    buckets=(64 * 1024, 256 * 1024, 1024 * 1024, 4 * 1024 * 1024, 8 * 1024 * 1024, 16 * 1024 * 1024))
+REQUEST_SECONDS = metrics.histogram(
+    'http_request_duration_seconds', 'Request latency by endpoint and status.',
+    labels=('endpoint', 'method', 'status'))
+metrics.counter('result_cache_hits_total', 'Result cache hits (memory and disk).',
+                lambda: result_cache.stats()['hits'])
+metrics.counter('result_cache_misses_total', 'Result cache misses.',
+                lambda: result_cache.stats()['misses'])
+metrics.counter('page_cache_hits_total', 'Page cache hits (memory and disk).',
+                lambda: page_cache.stats()['hits'])
+metrics.counter('page_cache_misses_total', 'Page cache misses.',
+                lambda: page_cache.stats()['misses'])
+metrics.gauge('job_queue_depth', 'Jobs waiting in the background job queue.',
+              lambda: job_queue.stats()['queued'])
+
+# Kept cheap: no per-request timing or logging
+UNTIMED_ENDPOINTS = {'health_check', 'metrics_endpoint'}
+
+@app.before_request
+def start_request_timer():
+    """Start timing the request and its processing stages."""
+    if request.endpoint in UNTIMED_ENDPOINTS:
+        return
+    g.request_start = time.perf_counter()
+    g.stage_timer = StageTimer(STAGE_SECONDS)
+
+@app.after_request
+def record_request_metrics(response):
+    """Record request latency and log the request's stage timings."""
+    if 'request_start' not in g:
+        return response
+
+    seconds = time.perf_counter() - g.request_start
+    REQUEST_SECONDS.observe(seconds, endpoint=request.endpoint or 'unknown',
+                            method=request.method, status=response.status_code)
+    if g.stage_timer.timings:
+        logger.info(json.dumps({
+            "event": "request_metrics",
+            "endpoint": request.endpoint,
+            "status": response.status_code,
+            "seconds": round(seconds, 6),
+            "request_bytes": request.content_length,
+            **g.stage_timer.as_dict()
+        }))
+    return response
 
 def allowed_file(filename):
     """Check if the file extension is allowed."""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def process_pdf(pdf_path):
-    """Process the PDF file and return simplified text."""
+# Values of the "format" query parameter: the rendered text summary, or the
+# structured summary and analysis (see enhanced_analyzer.build_summary and
+# enhanced_analyzer.analyze_text)
+RESULT_FORMATS = ('text', 'json')
+
+def get_result_format():
+    """Return (format, None) for the requested result format, or (None, error response)."""
+    result_format = request.args.get('format', 'text')
+    if result_format not in RESULT_FORMATS:
+        logger.error(f"Invalid result format: {result_format}")
+        return None, (jsonify({
+            "status": "error",
+            "message": f"Unknown format. Choose from: {', '.join(RESULT_FORMATS)}"
+        }), 400)
+    return result_format, None
+
+def get_requested_sections():
+    """Return (sections, None) for the "sections" query parameter, or (None,
+    error response).
+
+    sections is a comma-separated list of analysis section ids (see
+    enhanced_analyzer.ANALYSIS_PATTERNS); it is None when all are wanted.
+    """
+    value = request.args.get('sections', '')
+    sections = [section.strip() for section in value.split(',') if section.strip()]
+    if not sections:
+        return None, None
     try:
-        logger.info(f"Processing PDF: {pdf_path}")
-        # Extract text from PDF
-        text = extract_text_from_pdf(pdf_path)
+        return normalize_sections(sections), None
+    except ValueError as e:
+        logger.error(f"Invalid sections: {value}")
+        return None, (jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400)
+
+def format_result(result, result_format, timer=None):
+    """Return a process_pdf result in the requested format, timed as the
+    rendering stage on timer (a metrics.StageTimer) when given."""
+    timer = timer or StageTimer(STAGE_SECONDS)
+    with timer.stage('rendering'):
+        if result_format == 'json':
+            return result
+        if "summary" not in result:
+            return render_analysis_report(result["analysis"])
+        return render_summary(result["summary"])
+
+def get_uploaded_pdf():
+    """Return (file, None) for a valid PDF upload, or (None, error response)."""
+    # Receiving and parsing the multipart body happens on first access
+    with g.stage_timer.stage('upload'):
+        files = request.files
+
+    # Check if file was uploaded
+    if 'file' not in files:
+        logger.error("No file in request")
+        return None, (jsonify({
+            "status": "error",
+            "message": "No file uploaded"
+        }), 400)
+
+    file = files['file']
+
+    # Check if file is empty
+    if file.filename == '':
+        logger.error("Empty filename")
+        return None, (jsonify({
+            "status": "error",
+            "message": "No file selected"
+        }), 400)
+
+    # Check if file type is allowed
+    if not allowed_file(file.filename):
+        logger.error(f"Invalid file type: {file.filename}")
+        return None, (jsonify({
+            "status": "error",
+            "message": "File type not allowed. Only PDF files are accepted."
+        }), 400)
+
+    return file, None
+
+def describe_source(pdf_source):
+    """Describe a PDF source (path or bytes) for log messages."""
+    if isinstance(pdf_source, (bytes, bytearray)):
+        return f"<{len(pdf_source)} bytes in memory>"
+    return pdf_source
+
+def upload_source(file):
+    """Return the PDF source for an upload owned by the current request.
+
+    Uploads parsed into memory are returned as bytes; spooled uploads as the
+    path of their temp file, which is only valid until the request ends.
+    """
+    if isinstance(file.stream, io.BytesIO):
+        return file.stream.getvalue()
+    return file.stream.name
+
+def detach_upload(stream, size=None):
+    """Return a PDF source that outlives the request, for background work.
+
+    Streams up to UPLOAD_SPOOL_THRESHOLD bytes are read into memory; larger
+    ones are copied to a new temp file that the caller must remove.
+    """
+    if isinstance(stream, io.BytesIO):
+        return stream.getvalue()
+    if size is not None and size <= app.config['UPLOAD_SPOOL_THRESHOLD']:
+        return stream.read()
+    return save_upload_to_temp(stream)
+
+def save_upload_to_temp(stream):
+    """Copy an upload stream to a new, uniquely named temp file."""
+    fd, filepath = tempfile.mkstemp(suffix='.pdf', dir=app.config['UPLOAD_FOLDER'])
+    with os.fdopen(fd, 'wb') as f:
+        while True:
+            chunk = stream.read(64 * 1024)
+            if not chunk:
+                break
+            f.write(chunk)
+    return filepath
+
+# Document ids are SHA-256 hex digests
+DOCUMENT_ID_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+def document_id(pdf_source):
+    """Return the id of a PDF: the hash of its contents."""
+    if isinstance(pdf_source, (bytes, bytearray)):
+        return hash_bytes(pdf_source)
+    return hash_file(pdf_source)
+
+def cache_key(digest, sections=None):
+    """Build the result cache key for a PDF from its document_id and the
+    analysis sections requested (a normalize_sections result)."""
+    if sections is None:
+        return f"v{ANALYZER_VERSION}-{digest}"
+    return f"v{ANALYZER_VERSION}-{digest}-{'+'.join(sections)}"
+
+def process_pdf(pdf_source, timer=None, sections=None, filename=None):
+    """Process a PDF (a file path or its bytes) and return its structured
+    result: {"document_id": ..., "summary": ..., "analysis": ...} (see
+    format_result and document_id).
+
+    sections restricts the analysis to those section ids (a
+    normalize_sections result). The summary is then skipped: the result only
+    holds the requested analysis sections.
+
+    Full results of newly processed documents are added to the corpus index
+    under filename.
+
+    Stage timings, page count and sizes are recorded on timer (a
+    metrics.StageTimer) when given.
+    """
+    timer = timer or StageTimer(STAGE_SECONDS)
+    try:
+        with timer.stage('cache_lookup'):
+            digest = document_id(pdf_source)
+            key = cache_key(digest, sections)
+            cached = result_cache.get(key)
+        if cached is not None:
+            timer.info['cache'] = 'hit'
+            logger.info(f"Cache hit for PDF: {describe_source(pdf_source)}")
+            return {"document_id": digest, **cached}
+        timer.info['cache'] = 'miss'
+
+        if isinstance(pdf_source, (bytes, bytearray)):
+            pdf_bytes = len(pdf_source)
+        else:
+            pdf_bytes = os.path.getsize(pdf_source)
+        timer.info['pdf_bytes'] = pdf_bytes
+        DOCUMENT_BYTES.observe(pdf_bytes)
+
+        def on_page(page_number, page_text):
+            timer.info['pages'] = page_number
+
+        analysis_seconds = 0.0
+
+        def on_timing(stage, seconds):
+            nonlocal analysis_seconds
+            if stage == 'extraction':
+                PAGE_SECONDS.observe(seconds)
+            else:
+                analysis_seconds += seconds
+
+        logger.info(f"Processing PDF: {describe_source(pdf_source)}")
+        # Extract text from PDF, reusing cached pages. Changed pages are
+        # also scanned for the analysis patterns here; that time is counted
+        # as analysis, the rest (page digests, cache lookups, extraction)
+        # as extraction.
+        start = time.perf_counter()
+        text, page_starts, analysis = analyze_pdf(pdf_source, page_cache, on_page=on_page,
+                                                  sections=sections, on_timing=on_timing)
+        timer.record('extraction', time.perf_counter() - start - analysis_seconds)
+        timer.info['text_chars'] = len(text)
+        DOCUMENT_PAGES.observe(timer.info.get('pages', 0))
         logger.info(f"Successfully extracted text from PDF")
-        
-        # Generate simplified text
-        save_simplified_text(text, "simplified_text.txt")
-        logger.info("Successfully generated simplified text")
-        
-        # Read the generated simplified text
-        with open("simplified_text.txt", "r", encoding="utf-8") as f:
-            content = f.read()
-            
-        return content
+
+        # Build the summary once; the text response is rendered from it
+        start = time.perf_counter()
+        if sections is None:
+            result = {
+                "document_id": digest,
+                "summary": build_summary(text, page_starts),
+                "analysis": analysis
+            }
+            logger.info("Successfully generated summary")
+        else:
+            result = {"document_id": digest, "analysis": analysis}
+        timer.record('analysis', analysis_seconds + time.perf_counter() - start)
+
+        result_cache.set(key, result)
+
+        if sections is None and corpus_index is not None:
+            with timer.stage('indexing'):
+                try:
+                    corpus_index.add(digest, text, result, filename, ANALYZER_VERSION)
+                except sqlite3.Error as e:
+                    # The result is still served; only search misses it
+                    logger.warning(f"Could not index document {digest}: {str(e)}")
+        return result
     except Exception as e:
         logger.error(f"Error processing PDF: {str(e)}")
         raise
@@ -48,65 +397,32 @@ def simplify_policy():
     """API endpoint to upload and process a policy PDF."""
     try:
         logger.info("Received request to /api/simplify-policy")
-        
-        # Check if file was uploaded
-        if 'file' not in request.files:
-            logger.error("No file in request")
-            return jsonify({
-                "status": "error",
-                "message": "No file uploaded"
-            }), 400
-        
-        file = request.files['file']
-        
-        # Check if file is empty
-        if file.filename == '':
-            logger.error("Empty filename")
-            return jsonify({
-                "status": "error",
-                "message": "No file selected"
-            }), 400
-        
-        # Check if file type is allowed
-        if not allowed_file(file.filename):
-            logger.error(f"Invalid file type: {file.filename}")
-            return jsonify({
-                "status": "error",
-                "message": "File type not allowed. Only PDF files are accepted."
-            }), 400
-        
-        # Save the uploaded file
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        logger.info(f"Saving file to: {filepath}")
-        
-        try:
-            file.save(filepath)
-            logger.info("File saved successfully")
-        except Exception as e:
-            logger.error(f"Error saving file: {str(e)}")
-            return jsonify({
-                "status": "error",
-                "message": f"Error saving file: {str(e)}"
-            }), 500
-        
+
+        result_format, error = get_result_format()
+        if error:
+            return error
+
+        sections, error = get_requested_sections()
+        if error:
+            return error
+
+        file, error = get_uploaded_pdf()
+        if error:
+            return error
+
         try:
-            # Process the PDF
-            content = process_pdf(filepath)
-            
-            # Clean up the uploaded file
-            os.remove(filepath)
-            logger.info("File processed and cleaned up successfully")
-            
+            # Process the upload where it already is: in memory, or in the
+            # request's own spool file for large uploads
+            result = process_pdf(upload_source(file), g.stage_timer, sections, file.filename)
+            logger.info("File processed successfully")
+
             return jsonify({
                 "status": "success",
-                "data": content
+                "document_id": result["document_id"],
+                "data": format_result(result, result_format, g.stage_timer)
             })
-            
+
         except Exception as e:
-            # Clean up file even if processing fails
-            if os.path.exists(filepath):
-                os.remove(filepath)
             logger.error(f"Error processing file: {str(e)}")
             return jsonify({
                 "status": "error",
@@ -120,6 +436,431 @@ def simplify_policy():
             "message": f"Unexpected error: {str(e)}"
         }), 500
 
+def process_pdf_job(pdf_source, sections=None, filename=None):
+    """Process a detached PDF in the background, removing its temp file
+    afterwards if it has one."""
+    timer = StageTimer(STAGE_SECONDS)
+    try:
+        return process_pdf(pdf_source, timer, sections, filename)
+    finally:
+        logger.info(json.dumps({"event": "document_metrics", **timer.as_dict()}))
+        if isinstance(pdf_source, str) and os.path.exists(pdf_source):
+            os.remove(pdf_source)
+
+job_queue = JobQueue(
+    process_pdf_job,
+    workers=app.config['JOB_WORKERS'],
+    max_queued=app.config['JOB_QUEUE_SIZE']
+)
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Accept a policy PDF for background processing and return a job id."""
+    try:
+        logger.info("Received request to /api/jobs")
+
+        sections, error = get_requested_sections()
+        if error:
+            return error
+
+        file, error = get_uploaded_pdf()
+        if error:
+            return error
+
+        # The job outlives the request, so it gets its own copy of the upload
+        pdf_source = detach_upload(file.stream)
+        try:
+            job_id = job_queue.submit(pdf_source, sections, file.filename)
+        except QueueFullError:
+            if isinstance(pdf_source, str):
+                os.remove(pdf_source)
+            logger.warning("Job queue is full, rejecting upload")
+            response = jsonify({
+                "status": "error",
+                "message": "Too many documents are waiting to be processed. Please retry later."
+            })
+            response.headers['Retry-After'] = '5'
+            return response, 429
+        except Exception:
+            if isinstance(pdf_source, str) and os.path.exists(pdf_source):
+                os.remove(pdf_source)
+            raise
+
+        logger.info(f"Queued job {job_id}")
+        return jsonify({
+            "status": "accepted",
+            "job_id": job_id,
+            "status_url": f"/api/jobs/{job_id}"
+        }), 202
+
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": f"Unexpected error: {str(e)}"
+        }), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Return the status, and once finished the result, of a job."""
+    result_format, error = get_result_format()
+    if error:
+        return error
+
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({
+            "status": "error",
+            "message": "Job not found"
+        }), 404
+
+    if job["result"] is not None:
+        job["document_id"] = job["result"]["document_id"]
+        job["result"] = format_result(job["result"], result_format, g.stage_timer)
+
+    return jsonify({
+        "status": "success",
+        "data": job
+    })
+
+class BatchTooLargeError(Exception):
+    """A batch holds more documents, or more unzipped data, than accepted."""
+
+def collect_batch_documents(uploads):
+    """Split batch uploads into PDFs to process and per-file errors.
+
+    Each PDF, and each PDF member of a zip archive, is detached from the
+    request (see detach_upload). Returns (documents, errors) where documents
+    is a list of (name, PDF source) and errors a list of (name, message).
+
+    Raises BatchTooLargeError as soon as the batch exceeds BATCH_MAX_FILES
+    documents or its zip members BATCH_MAX_UNZIPPED_BYTES, before the
+    offending document is decompressed. Temp files already detached are
+    removed whenever an error is raised.
+    """
+    documents = []
+    errors = []
+    max_size = app.config['MAX_CONTENT_LENGTH']
+    max_files = app.config['BATCH_MAX_FILES']
+    max_unzipped = app.config['BATCH_MAX_UNZIPPED_BYTES']
+    unzipped = 0
+
+    def check_count():
+        if len(documents) >= max_files:
+            raise BatchTooLargeError(f"Too many documents. At most {max_files} are accepted per batch.")
+
+    try:
+        for upload in uploads:
+            name = upload.filename or ''
+            if name.lower().endswith('.zip'):
+                try:
+                    with zipfile.ZipFile(upload.stream) as archive:
+                        for member in archive.infolist():
+                            if member.is_dir() or member.filename.startswith('__MACOSX/'):
+                                continue
+                            member_name = f"{name}/{member.filename}"
+                            if not allowed_file(member.filename):
+                                errors.append((member_name, "File type not allowed. Only PDF files are accepted."))
+                            elif member.file_size > max_size:
+                                errors.append((member_name, "File is larger than the upload limit."))
+                            else:
+                                check_count()
+                                # file_size is also the most archive.open will
+                                # ever decompress for the member
+                                unzipped += member.file_size
+                                if unzipped > max_unzipped:
+                                    raise BatchTooLargeError(
+                                        f"Zip archives too large. At most {max_unzipped} bytes of PDFs "
+                                        f"are accepted per batch once unzipped.")
+                                with archive.open(member) as member_stream:
+                                    documents.append((member_name, detach_upload(member_stream, member.file_size)))
+                except zipfile.BadZipFile:
+                    errors.append((name, "Invalid zip archive"))
+            elif allowed_file(name):
+                check_count()
+                documents.append((name, detach_upload(upload.stream)))
+            else:
+                errors.append((name, "File type not allowed. Only PDF or zip files are accepted."))
+    except BaseException:
+        for _, pdf_source in documents:
+            if isinstance(pdf_source, str) and os.path.exists(pdf_source):
+                os.remove(pdf_source)
+        raise
+
+    return documents, errors
+
+@app.route('/api/simplify-policy/batch', methods=['POST'])
+def simplify_policy_batch():
+    """Process many policy PDFs concurrently, streaming results as NDJSON.
+
+    Accepts any number of PDF or zip files in the "files" (or "file") field.
+    Each line of the response is one document's result, in completion order.
+    """
+    try:
+        logger.info("Received request to /api/simplify-policy/batch")
+
+        result_format, error = get_result_format()
+        if error:
+            return error
+
+        sections, error = get_requested_sections()
+        if error:
+            return error
+
+        with g.stage_timer.stage('upload'):
+            files = request.files
+        uploads = [f for f in files.getlist('files') + files.getlist('file') if f.filename]
+        if not uploads:
+            logger.error("No files in batch request")
+            return jsonify({
+                "status": "error",
+                "message": "No files uploaded"
+            }), 400
+
+        try:
+            documents, errors = collect_batch_documents(uploads)
+        except BatchTooLargeError as e:
+            logger.error(f"Batch rejected: {str(e)}")
+            return jsonify({
+                "status": "error",
+                "message": str(e)
+            }), 400
+
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": f"Unexpected error: {str(e)}"
+        }), 500
+
+    logger.info(f"Processing batch of {len(documents)} documents")
+
+    # process_pdf_job removes any temp file once its document is processed
+    futures = {batch_pool.submit(process_pdf_job, pdf_source, sections, name): (name, pdf_source)
+               for name, pdf_source in documents}
+
+    def generate():
+        try:
+            for name, message in errors:
+                yield json.dumps({"filename": name, "status": "error", "message": message}) + "\n"
+
+            for future in as_completed(futures):
+                name, _ = futures[future]
+                try:
+                    result = future.result()
+                    line = {"filename": name, "status": "success", "document_id": result["document_id"],
+                            "data": format_result(result, result_format)}
+                except Exception as e:
+                    line = {"filename": name, "status": "error",
+                            "message": f"Error processing file: {str(e)}"}
+                yield json.dumps(line) + "\n"
+        finally:
+            # The client went away: drop documents that have not started
+            for future, (_, pdf_source) in futures.items():
+                if future.cancel() and isinstance(pdf_source, str) and os.path.exists(pdf_source):
+                    os.remove(pdf_source)
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def get_float_arg(name):
+    """Return a numeric query parameter, None if absent; raises ValueError."""
+    value = request.args.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+
+def get_int_arg(name):
+    """Return an integer query parameter, None if absent; raises ValueError."""
+    value = request.args.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+
+@app.route('/api/corpus/search', methods=['GET'])
+def search_corpus():
+    """Search the documents processed so far, answered from the corpus
+    index without reading any PDF."""
+    if corpus_index is None:
+        return jsonify({
+            "status": "error",
+            "message": "The corpus index is disabled"
+        }), 404
+
+    try:
+        limit = get_int_arg('limit')
+        if limit is None:
+            limit = 20
+        elif limit < 1:
+            raise ValueError("limit must be at least 1")
+        documents = corpus_index.search(
+            query=request.args.get('q'),
+            section=request.args.get('section') or None,
+            insurer=request.args.get('insurer'),
+            min_sum_insured=get_float_arg('min_sum_insured'),
+            max_sum_insured=get_float_arg('max_sum_insured'),
+            waiting_period=request.args.get('waiting_period') or None,
+            max_waiting_months=get_float_arg('max_waiting_months'),
+            limit=min(limit, 100)
+        )
+    except ValueError as e:
+        logger.error(f"Invalid corpus search: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+
+    return jsonify({
+        "status": "success",
+        "data": {"count": len(documents), "documents": documents}
+    })
+
+def load_document_profile(digest):
+    """Return (profile, filename) for a processed document, or (None, None)
+    if it is neither in the result cache nor in the corpus index.
+
+    The cached analysis supplies the section texts. The sums insured and
+    waiting periods come from the corpus index when it has the document,
+    as they were read from its whole text there. Documents evicted from
+    the cache are compared from the index alone.
+    """
+    cached = result_cache.get(cache_key(digest))
+    indexed = corpus_index.get(digest) if corpus_index is not None else None
+    if cached is not None:
+        profile = profile_from_result(cached)
+        if indexed is not None:
+            profile.update(insurer=indexed["insurer"], sum_insured=indexed["sum_insured"],
+                           waiting_periods=indexed["waiting_periods"])
+    elif indexed is not None:
+        profile = profile_from_index(indexed, corpus_index.section_texts(digest))
+    else:
+        return None, None
+    return profile, indexed["filename"] if indexed else None
+
+@app.route('/api/compare', methods=['GET'])
+def compare_documents():
+    """Compare documents processed before, by document id, without
+    extracting them again."""
+    sections, error = get_requested_sections()
+    if error:
+        return error
+
+    document_ids = list(dict.fromkeys(
+        value.strip().lower() for value in request.args.get('documents', '').split(',') if value.strip()))
+    if not 2 <= len(document_ids) <= MAX_COMPARED_DOCUMENTS:
+        logger.error(f"Invalid comparison of {len(document_ids)} documents")
+        return jsonify({
+            "status": "error",
+            "message": f"Give between 2 and {MAX_COMPARED_DOCUMENTS} distinct document ids in \"documents\""
+        }), 400
+    invalid = [value for value in document_ids if not DOCUMENT_ID_PATTERN.fullmatch(value)]
+    if invalid:
+        logger.error(f"Invalid document ids: {', '.join(invalid)}")
+        return jsonify({
+            "status": "error",
+            "message": f"Invalid document ids: {', '.join(invalid)}"
+        }), 400
+
+    try:
+        profiles = []
+        documents = []
+        missing = []
+        for digest in document_ids:
+            profile, filename = load_document_profile(digest)
+            if profile is None:
+                missing.append(digest)
+            else:
+                profiles.append(profile)
+                documents.append({"document_id": digest, "filename": filename})
+        if missing:
+            return jsonify({
+                "status": "error",
+                "message": f"Documents not processed yet: {', '.join(missing)}. Upload them first."
+            }), 404
+
+        return jsonify({
+            "status": "success",
+            "data": {"documents": documents, **compare_profiles(profiles, sections)}
+        })
+    except Exception as e:
+        logger.error(f"Error comparing documents: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": f"Error comparing documents: {str(e)}"
+        }), 500
+
+@app.route('/api/visualizations/<digest>', methods=['GET'])
+def get_visualizations(digest):
+    """Return the Plotly figure specs of a processed document's charts,
+    built from its cached result (see visualizations.build_figure_specs)."""
+    digest = digest.lower()
+    if not DOCUMENT_ID_PATTERN.fullmatch(digest):
+        logger.error(f"Invalid document id: {digest}")
+        return jsonify({
+            "status": "error",
+            "message": "Invalid document id"
+        }), 400
+
+    key = f"charts-v{ANALYZER_VERSION}.{CHART_VERSION}-{digest}"
+    try:
+        charts = chart_cache.get(key)
+        if charts is None:
+            cached = result_cache.get(cache_key(digest))
+            if cached is None:
+                return jsonify({
+                    "status": "error",
+                    "message": f"Document not processed yet: {digest}. Upload it first."
+                }), 404
+            # The same input the visualizations script reads from
+            # simplified_text.txt
+            with g.stage_timer.stage('charts'):
+                charts = build_figure_specs(chart_data(render_summary(cached["summary"])))
+            chart_cache.set(key, charts)
+
+        return jsonify({
+            "status": "success",
+            "document_id": digest,
+            "data": charts
+        })
+    except Exception as e:
+        logger.error(f"Error building charts: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": f"Error building charts: {str(e)}"
+        }), 500
+
+@app.route('/api/corpus/stats', methods=['GET'])
+def corpus_stats():
+    """Report the number of documents in the corpus index."""
+    if corpus_index is None:
+        return jsonify({
+            "status": "error",
+            "message": "The corpus index is disabled"
+        }), 404
+
+    return jsonify({
+        "status": "success",
+        "data": corpus_index.stats()
+    })
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Report result and page cache hit/miss counts for this worker."""
+    return jsonify({
+        "status": "success",
+        "data": {**result_cache.stats(), "pages": page_cache.stats()}
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Export metrics in the Prometheus text format."""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint for Render."""
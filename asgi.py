@@ -0,0 +1,262 @@
+"""ASGI variant of the simplify API, for serving many slow uploads per process.
+
+Run with any ASGI server, e.g.:
+
+    uvicorn asgi:app --workers 2
+
+Uploads are received without holding a thread, so a process can wait on
+many slow clients at once; only extraction and analysis run on the
+ANALYSIS_WORKERS threads. Results, caches, the corpus index and metrics are
+those of the Flask app (see app.py), so both share one configuration.
+"""
+import asyncio
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, File, MultipartDecoder, NeedData
+
+import app as flask_app
+from enhanced_analyzer import normalize_sections
+from metrics import StageTimer
+
+logger = logging.getLogger(__name__)
+
+config = flask_app.app.config
+
+# Threads running process_pdf. Long documents are further split across the
+# EXTRACTION_WORKERS processes, as under gunicorn.
+ANALYSIS_WORKERS = int(os.environ.get('ANALYSIS_WORKERS', os.cpu_count() or 1))
+
+analysis_pool = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix='analysis-worker')
+
+
+class RequestError(Exception):
+    """A request the API rejects, with the HTTP status to answer."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class ClientDisconnected(Exception):
+    """The client went away before its upload was received."""
+
+
+async def send_json(send, status, payload):
+    body = flask_app.app.json.dumps(payload).encode('utf-8')
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode('ascii'))]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def get_header(scope, name):
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+def parse_query(scope):
+    """Return (format, sections) for the query string, as app.py accepts
+    them; raises RequestError."""
+    args = parse_qs(scope.get("query_string", b"").decode('latin-1'))
+    result_format = args.get('format', ['text'])[0]
+    if result_format not in flask_app.RESULT_FORMATS:
+        raise RequestError(f"Unknown format. Choose from: {', '.join(flask_app.RESULT_FORMATS)}")
+
+    sections = [section.strip() for section in args.get('sections', [''])[0].split(',') if section.strip()]
+    if not sections:
+        return result_format, None
+    try:
+        return result_format, normalize_sections(sections)
+    except ValueError as e:
+        raise RequestError(str(e))
+
+
+async def receive_upload(scope, receive, timer):
+    """Receive the multipart body and return (filename, stream) of its
+    "file" field; raises RequestError.
+
+    The body is parsed as it arrives. Bodies up to UPLOAD_SPOOL_THRESHOLD
+    bytes are kept in memory; larger ones are written to a temp file that
+    the caller must close.
+    """
+    content_type, options = parse_options_header(get_header(scope, b"content-type") or '')
+    boundary = options.get('boundary')
+    if content_type != 'multipart/form-data' or not boundary:
+        raise RequestError("No file uploaded")
+
+    content_length = get_header(scope, b"content-length")
+    content_length = int(content_length) if content_length and content_length.isdigit() else None
+    if content_length is not None and content_length > config['MAX_CONTENT_LENGTH']:
+        raise RequestError("File too large", 413)
+
+    decoder = MultipartDecoder(boundary.encode('latin-1'), config.get('MAX_FORM_MEMORY_SIZE'))
+    filename = None
+    stream = None
+    in_file = False
+    received = 0
+    start = time.perf_counter()
+    try:
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise ClientDisconnected()
+            chunk = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            received += len(chunk)
+            if received > config['MAX_CONTENT_LENGTH']:
+                raise RequestError("File too large", 413)
+            decoder.receive_data(chunk)
+            if not more_body:
+                decoder.receive_data(None)
+
+            event = decoder.next_event()
+            while not isinstance(event, (NeedData, Epilogue)):
+                if isinstance(event, File):
+                    in_file = event.name == 'file' and filename is None
+                    if in_file:
+                        filename = event.filename
+                        if content_length is not None and content_length <= config['UPLOAD_SPOOL_THRESHOLD']:
+                            stream = io.BytesIO()
+                        else:
+                            stream = tempfile.NamedTemporaryFile(suffix='.pdf', dir=config['UPLOAD_FOLDER'])
+                elif isinstance(event, Data):
+                    if in_file:
+                        stream.write(event.data)
+                    if not event.more_data:
+                        in_file = False
+                else:
+                    in_file = False
+                event = decoder.next_event()
+    except (ValueError, RequestEntityTooLarge) as e:
+        if stream is not None:
+            stream.close()
+        raise RequestError(f"Invalid upload: {str(e)}")
+    except BaseException:
+        if stream is not None:
+            stream.close()
+        raise
+    finally:
+        timer.record('upload', time.perf_counter() - start)
+
+    if stream is None:
+        raise RequestError("No file uploaded")
+    if not filename:
+        stream.close()
+        raise RequestError("No file selected")
+    if not flask_app.allowed_file(filename):
+        stream.close()
+        raise RequestError("File type not allowed. Only PDF files are accepted.")
+    stream.flush()
+    return filename, stream
+
+
+async def simplify_policy(scope, receive, send):
+    """Same contract as POST /api/simplify-policy in app.py."""
+    timer = StageTimer(flask_app.STAGE_SECONDS)
+    started = time.perf_counter()
+    status = 500
+    try:
+        try:
+            result_format, sections = parse_query(scope)
+            filename, stream = await receive_upload(scope, receive, timer)
+        except RequestError as e:
+            logger.error(str(e))
+            status = e.status
+            await send_json(send, status, {"status": "error", "message": str(e)})
+            return
+        except ClientDisconnected:
+            logger.info("Client disconnected during upload")
+            # As logged by nginx for requests the client closed
+            status = 499
+            return
+
+        with stream:
+            pdf_source = stream.getvalue() if isinstance(stream, io.BytesIO) else stream.name
+            try:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(
+                    analysis_pool, flask_app.process_pdf, pdf_source, timer, sections, filename)
+                data = flask_app.format_result(result, result_format, timer)
+            except Exception as e:
+                logger.error(f"Error processing file: {str(e)}")
+                await send_json(send, status, {
+                    "status": "error",
+                    "message": f"Error processing file: {str(e)}"
+                })
+                return
+
+        status = 200
+        await send_json(send, status, {
+            "status": "success",
+            "document_id": result["document_id"],
+            "data": data
+        })
+    finally:
+        seconds = time.perf_counter() - started
+        flask_app.REQUEST_SECONDS.observe(seconds, endpoint='simplify_policy', method='POST', status=status)
+        if timer.timings:
+            logger.info(json.dumps({
+                "event": "request_metrics",
+                "endpoint": 'simplify_policy',
+                "status": status,
+                "seconds": round(seconds, 6),
+                **timer.as_dict()
+            }))
+
+
+async def health_check(scope, receive, send):
+    await send_json(send, 200, {
+        "status": "healthy",
+        "message": "API is running"
+    })
+
+
+ROUTES = {
+    '/api/simplify-policy': ('POST', simplify_policy),
+    '/health': ('GET', health_check)
+}
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            analysis_pool.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    """The ASGI application."""
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    route = ROUTES.get(scope["path"].rstrip('/') or '/')
+    if route is None:
+        await send_json(send, 404, {"status": "error", "message": "Not found"})
+        return
+    method, handler = route
+    if scope["method"] not in (method, 'HEAD' if method == 'GET' else method):
+        await send_json(send, 405, {"status": "error", "message": "Method not allowed"})
+        return
+    await handler(scope, receive, send)
@@ -0,0 +1,390 @@
+"""Benchmarks for the policy simplifier pipeline.
+
+Usage:
+    python benchmark.py stages [PDF ...] [--scales 1 10 100] [--output FILE]
+    python benchmark.py compare OLD.json NEW.json [--tolerance 0.10]
+    python benchmark.py backends [PDF ...] [--repeat N]
+    python benchmark.py import-time [--budget SECONDS] [--repeat N]
+    python benchmark.py adversarial [--repeats N] [--budget SECONDS]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from pdf_backends import BACKENDS, DEFAULT_BACKEND, get_backend, normalize_page_text
+
+DEFAULT_PDFS = [
+    "total-health-plan.pdf",
+    "Brochure_Star_Health_Premier_Insurance_Policy_V_4_Web_491b821a90 (1).pdf"
+]
+DEFAULT_SCALES = [1, 10, 100]
+
+# Libraries only specific features need. Importing the web app must not load
+# any of them; they are imported where they are used.
+HEAVY_MODULES = [
+    "torch", "transformers", "spacy", "keybert", "nltk",
+    "plotly", "pandas", "numpy", "fitz", "PyPDF2"
+]
+
+# Period-free inputs built from pattern keywords, which made the original
+# unbounded [^.]* patterns backtrack polynomially. Each phrase is repeated
+# to the requested size.
+ADVERSARIAL_PHRASES = {
+    "exclusions": "excluded treatment ",
+    "claims": "claim document submit ",
+    "contact": "contact helpline number email ",
+    "waiting": "waiting period 30 days ",
+    "features": "Benefits provides includes ",
+    "discounts": "discount 10% reduction ",
+    "eligibility": "Eligibility age years ",
+    "coverage": "coverage for treatment of ",
+    "table": "Sum Insured Rs 5,00,000 | 10,00,000 | excluded | claim | contact\n",
+    "policy": "Star Health Premier Insurance Policy Limited ",
+    "benefits": "Benefits include stuff ",
+    "whitespace": " " * 10,
+}
+
+IMPORT_PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+print(",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def time_backend(backend, pdf_path, repeat):
+    """Return (best seconds, page count, characters) for one backend."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pages = [normalize_page_text(text) for text in backend.iter_pages(pdf_path)]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(pages), sum(len(page) for page in pages)
+
+
+def benchmark_backends(pdf_paths, repeat=3):
+    """Compare text extraction speed of every installed PDF backend."""
+    results = []
+    for pdf_path in pdf_paths:
+        print(f"\n{pdf_path}")
+        print(f"{'backend':<10} {'seconds':>9} {'pages/sec':>10} {'chars':>9}")
+        timings = {}
+        for name, backend_class in BACKENDS.items():
+            if not backend_class.available():
+                print(f"{name:<10} not installed")
+                continue
+            seconds, pages, chars = time_backend(backend_class(), pdf_path, repeat)
+            timings[name] = seconds
+            print(f"{name:<10} {seconds:>9.3f} {pages / seconds:>10.1f} {chars:>9}")
+            results.append({
+                "pdf": pdf_path,
+                "backend": name,
+                "seconds": seconds,
+                "pages": pages,
+                "pages_per_sec": pages / seconds,
+                "chars": chars
+            })
+        if len(timings) == len(BACKENDS):
+            print(f"pymupdf is {timings['pypdf2'] / timings['pymupdf']:.1f}x faster than pypdf2")
+    return results
+
+
+def scale_pdf(pdf_path, factor):
+    """Return the bytes of a PDF whose pages are pdf_path's repeated factor times."""
+    if BACKENDS["pymupdf"].available():
+        import fitz
+        with fitz.open(pdf_path) as source, fitz.open() as scaled:
+            for _ in range(factor):
+                scaled.insert_pdf(source)
+            return scaled.tobytes()
+
+    import PyPDF2
+    reader = PyPDF2.PdfReader(pdf_path)
+    writer = PyPDF2.PdfWriter()
+    for _ in range(factor):
+        for page in reader.pages:
+            writer.add_page(page)
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def measure(func, repeat):
+    """Return (best seconds, peak traced bytes) for func().
+
+    Timing runs are untraced because tracemalloc slows Python code down; a
+    separate traced run records the peak of Python-level allocations.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def pipeline_stages(pdf_source, text, pages, work_dir):
+    """Return (name, callable) for each pipeline stage on one document.
+
+    The text stages take the already extracted text so they are measured
+    on their own. Stages that write files do so inside work_dir.
+    """
+    from enhanced_analyzer import analyze_pdf, analyze_text, extract_text_from_pdf, save_simplified_text
+    from document_analyzer import DocumentAnalyzer
+    from result_cache import ResultCache
+    import visualizations
+
+    # Every page cached, as when a document is re-analyzed unchanged
+    page_cache = ResultCache(max_entries=pages)
+    analyze_pdf(pdf_source, page_cache)
+
+    def run_document_analyzer():
+        analyzer = DocumentAnalyzer.__new__(DocumentAnalyzer)
+        analyzer.text_content = text
+        analyzer.page_matches = None
+        analyzer.analysis_results = []
+        analyzer.analyze_text()
+
+    def run_visualizations():
+        # generate_visualizations() reads simplified_text.txt from the
+        # working directory; feed it the full text to exercise it at scale.
+        # Earlier runs' charts are removed so every run renders them all.
+        with open("simplified_text.txt", "w", encoding="utf-8") as f:
+            f.write(text)
+        shutil.rmtree(visualizations.STATIC_DIR, ignore_errors=True)
+        visualizations.generate_visualizations()
+
+    return [
+        ("extract_text_from_pdf", lambda: extract_text_from_pdf(pdf_source)),
+        ("analyze_text", lambda: analyze_text(text)),
+        ("analyze_pdf (cached pages)", lambda: analyze_pdf(pdf_source, page_cache)),
+        ("save_simplified_text", lambda: save_simplified_text(text, os.path.join(work_dir, "simplified.txt"))),
+        ("DocumentAnalyzer.analyze_text", run_document_analyzer),
+        ("generate_visualizations", run_visualizations)
+    ]
+
+
+def benchmark_stages(pdf_paths, scales, repeat=1, stages=None):
+    """Time every pipeline stage on each PDF at each scale factor.
+
+    Scale factor N repeats the document's pages N times, both in the PDF fed
+    to extraction and in the text fed to the later stages.
+    """
+    from enhanced_analyzer import extract_text_from_pdf
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        cwd = os.getcwd()
+        pdf_paths = [os.path.abspath(pdf_path) for pdf_path in pdf_paths]
+        os.chdir(work_dir)
+        try:
+            for pdf_path in pdf_paths:
+                for scale in scales:
+                    pdf_source = pdf_path if scale == 1 else scale_pdf(pdf_path, scale)
+                    pages = get_backend().page_count(pdf_source)
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        text = extract_text_from_pdf(pdf_source)
+
+                    print(f"\n{os.path.basename(pdf_path)} x{scale} ({pages} pages, {len(text)} chars)")
+                    print(f"{'stage':<32} {'seconds':>9} {'pages/sec':>10} {'peak MB':>9}")
+                    for name, func in pipeline_stages(pdf_source, text, pages, work_dir):
+                        if stages and name not in stages:
+                            continue
+                        with contextlib.redirect_stdout(io.StringIO()):
+                            seconds, peak = measure(func, repeat)
+                        print(f"{name:<32} {seconds:>9.3f} {pages / seconds:>10.1f} {peak / 2**20:>9.1f}")
+                        results.append({
+                            "stage": name,
+                            "pdf": os.path.basename(pdf_path),
+                            "scale": scale,
+                            "pages": pages,
+                            "chars": len(text),
+                            "seconds": seconds,
+                            "pages_per_sec": pages / seconds,
+                            "peak_mb": peak / 2**20
+                        })
+        finally:
+            os.chdir(cwd)
+
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pdf_backend": DEFAULT_BACKEND,
+        "repeat": repeat,
+        "results": results
+    }
+
+
+def compare_results(old, new, tolerance=0.10):
+    """Print per-stage time changes between two result files.
+
+    Returns False if any stage got slower by more than tolerance (a fraction).
+    """
+    def key(result):
+        return result["stage"], result["pdf"], result["scale"]
+
+    old_results = {key(result): result for result in old["results"]}
+    ok = True
+    print(f"{'stage':<32} {'pdf':<24} {'scale':>5} {'old s':>8} {'new s':>8} {'change':>8}")
+    for result in new["results"]:
+        previous = old_results.get(key(result))
+        if previous is None:
+            continue
+        change = result["seconds"] / previous["seconds"] - 1
+        flag = ""
+        if change > tolerance:
+            flag = "  REGRESSION"
+            ok = False
+        print(f"{result['stage']:<32} {result['pdf'][:24]:<24} {result['scale']:>5} "
+              f"{previous['seconds']:>8.3f} {result['seconds']:>8.3f} {change:>+8.1%}{flag}")
+    return ok
+
+
+def check_import_time(module="app", budget=1.0, repeat=5):
+    """Import module in fresh interpreters and check it stays within budget.
+
+    Returns True when the median import time is within budget seconds and
+    no module from HEAVY_MODULES was loaded as a side effect.
+    """
+    probe = IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    loaded = set()
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", probe], cwd=repo_dir,
+            capture_output=True, text=True, check=True
+        ).stdout.splitlines()
+        timings.append(float(output[0]))
+        loaded.update(name for name in output[1].split(",") if name)
+
+    median = statistics.median(timings)
+    print(f"import {module}: median {median:.3f}s over {repeat} runs (budget {budget:.3f}s)")
+
+    ok = True
+    if median > budget:
+        print(f"FAIL: import {module} exceeds the {budget:.3f}s budget")
+        ok = False
+    if loaded:
+        print(f"FAIL: import {module} loads heavy modules: {', '.join(sorted(loaded))}")
+        ok = False
+    if ok:
+        print("OK")
+    return ok
+
+
+def benchmark_adversarial(repeats=3000, budget=1.0):
+    """Time the analysis patterns on pathological inputs.
+
+    Every DocumentAnalyzer report pattern, enhanced_analyzer.analyze_text
+    and build_summary run on each ADVERSARIAL_PHRASES input. Returns False
+    if any of them takes longer than budget seconds.
+    """
+    from document_analyzer import REPORT_PATTERNS
+    from enhanced_analyzer import analyze_text, build_summary
+
+    def run_report_patterns(text):
+        slowest = 0.0
+        for pattern in REPORT_PATTERNS.values():
+            start = time.perf_counter()
+            pattern.findall(text)
+            slowest = max(slowest, time.perf_counter() - start)
+        return slowest
+
+    def timed(func, text):
+        start = time.perf_counter()
+        func(text)
+        return time.perf_counter() - start
+
+    ok = True
+    print(f"{'input':<12} {'chars':>8} {'report s':>9} {'analyze s':>10} {'summary s':>10}")
+    for name, phrase in ADVERSARIAL_PHRASES.items():
+        text = ("Sum Insured" if name == "whitespace" else "") + phrase * repeats
+        timings = (run_report_patterns(text), timed(analyze_text, text), timed(build_summary, text))
+        flag = ""
+        if max(timings) > budget:
+            flag = "  OVER BUDGET"
+            ok = False
+        print(f"{name:<12} {len(text):>8} {timings[0]:>9.3f} {timings[1]:>10.3f} {timings[2]:>10.3f}{flag}")
+    print("OK" if ok else f"FAIL: some input exceeds the {budget:.3f}s budget")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    stages = subparsers.add_parser("stages", help="time each pipeline stage at several document sizes")
+    stages.add_argument("pdfs", nargs="*", default=DEFAULT_PDFS)
+    stages.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES)
+    stages.add_argument("--stage", action="append", dest="stages", help="only run this stage (repeatable)")
+    stages.add_argument("--repeat", type=int, default=1)
+    stages.add_argument("--output", help="write results as JSON to this file")
+
+    compare = subparsers.add_parser("compare", help="compare two stages result files")
+    compare.add_argument("old")
+    compare.add_argument("new")
+    compare.add_argument("--tolerance", type=float, default=0.10,
+                         help="allowed slowdown before a stage is flagged (fraction)")
+
+    backends = subparsers.add_parser("backends", help="compare PDF extraction backends")
+    backends.add_argument("pdfs", nargs="*", default=DEFAULT_PDFS)
+    backends.add_argument("--repeat", type=int, default=3)
+
+    import_time = subparsers.add_parser("import-time", help="fail if importing the web app is too slow")
+    import_time.add_argument("--module", default="app")
+    import_time.add_argument("--budget", type=float, default=1.0, help="seconds")
+    import_time.add_argument("--repeat", type=int, default=5)
+
+    adversarial = subparsers.add_parser("adversarial", help="fail if a pattern backtracks on pathological input")
+    adversarial.add_argument("--repeats", type=int, default=3000, help="times each phrase is repeated")
+    adversarial.add_argument("--budget", type=float, default=1.0,
+                             help="seconds allowed per pattern set and input")
+
+    args = parser.parse_args()
+    if args.command == "stages":
+        report = benchmark_stages(args.pdfs, args.scales, args.repeat, args.stages)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"\nResults saved to: {args.output}")
+    elif args.command == "compare":
+        with open(args.old, encoding="utf-8") as f:
+            old = json.load(f)
+        with open(args.new, encoding="utf-8") as f:
+            new = json.load(f)
+        if not compare_results(old, new, args.tolerance):
+            sys.exit(1)
+    elif args.command == "backends":
+        benchmark_backends(args.pdfs, args.repeat)
+    elif args.command == "import-time":
+        if not check_import_time(args.module, args.budget, args.repeat):
+            sys.exit(1)
+    elif args.command == "adversarial":
+        if not benchmark_adversarial(args.repeats, args.budget):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
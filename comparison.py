@@ -0,0 +1,112 @@
+from corpus_index import extract_sum_insured, extract_waiting_periods
+from enhanced_analyzer import ANALYSIS_PATTERNS, ANALYSIS_SECTION_TITLES
+
+# Most documents one comparison may include
+MAX_COMPARED_DOCUMENTS = 5
+
+
+def _normalize(text):
+    return ' '.join(text.split())
+
+
+def _section_texts(section):
+    """Return the distinct match texts of an analysis section, in order."""
+    if "categories" in section:
+        matches = [match for category in section["categories"].values() for match in category["matches"]]
+    else:
+        matches = section["matches"]
+    return list(dict.fromkeys(_normalize(match["text"]) for match in matches))
+
+
+def _summary_texts(summary, item_id):
+    texts = []
+    for section in summary["sections"].values():
+        for item in section["items"]:
+            if item["id"] == item_id:
+                values = [item["value"]] if "value" in item else item["values"]
+                texts.extend(value["text"] for value in values)
+    return texts
+
+
+def _longest_periods(periods):
+    longest = {}
+    for period in periods:
+        longest[period["kind"]] = max(longest.get(period["kind"], 0), period["months"])
+    return longest
+
+
+def profile_from_result(result):
+    """Return the comparable facts of a full app.process_pdf result.
+
+    A profile holds the insurer, the sums insured, the longest waiting
+    period of each kind and the distinct match texts of every analysis
+    section. The amounts and periods are read from the matched text only,
+    as the result does not keep the whole document.
+    """
+    summary = result["summary"]
+    sections = {section_id: _section_texts(section)
+                for section_id, section in result["analysis"]["sections"].items()}
+    insurer = _summary_texts(summary, 'insurer')
+
+    coverage_text = '\n'.join(_summary_texts(summary, 'sum_insured_options') + sections.get('coverage_details', []))
+    waiting_text = '\n'.join(_summary_texts(summary, 'waiting_periods') + sections.get('waiting_periods', []))
+    return {
+        "insurer": insurer[0] if insurer else None,
+        "sum_insured": extract_sum_insured(coverage_text),
+        "waiting_periods": _longest_periods(extract_waiting_periods(waiting_text)),
+        "sections": sections
+    }
+
+
+def profile_from_index(document, section_texts):
+    """Return the profile of a document known only to the corpus index,
+    from its corpus_index.CorpusIndex.get description and section_texts."""
+    return {
+        "insurer": document["insurer"],
+        "sum_insured": document["sum_insured"],
+        "waiting_periods": document["waiting_periods"],
+        "sections": {section_id: list(dict.fromkeys(content.split('\n')))
+                     for section_id, content in section_texts.items()}
+    }
+
+
+def compare_profiles(profiles, sections=None):
+    """Align the profiles of several documents and return what differs.
+
+    Scalar facts list one value per document with "same" telling whether
+    they all agree. Sums insured also list the amounts every document
+    offers. Each analysis section lists the texts common to all documents
+    and, per document, the texts only it has. sections restricts the
+    analysis sections compared (a normalize_sections result).
+    """
+    insurers = [profile["insurer"] for profile in profiles]
+    amounts = [profile["sum_insured"] for profile in profiles]
+    common_amounts = set(amounts[0]).intersection(*amounts[1:])
+
+    kinds = list(dict.fromkeys(kind for profile in profiles for kind in profile["waiting_periods"]))
+    waiting_periods = {}
+    for kind in kinds:
+        values = [profile["waiting_periods"].get(kind) for profile in profiles]
+        waiting_periods[kind] = {"values": values, "same": len(set(values)) == 1}
+
+    compared_sections = {}
+    for section_id in sections or ANALYSIS_PATTERNS:
+        texts = [profile["sections"].get(section_id, []) for profile in profiles]
+        common = set(texts[0]).intersection(*texts[1:])
+        compared_sections[section_id] = {
+            "title": ANALYSIS_SECTION_TITLES[section_id],
+            "common": [text for text in texts[0] if text in common],
+            "only": [[text for text in document_texts if text not in common] for document_texts in texts],
+            "same": all(set(document_texts) == common for document_texts in texts)
+        }
+
+    return {
+        "insurer": {"values": insurers, "same": len(set(insurers)) == 1},
+        "sum_insured": {
+            "values": amounts,
+            "common": sorted(common_amounts),
+            "same": all(set(document_amounts) == common_amounts for document_amounts in amounts)
+        },
+        "waiting_periods": waiting_periods,
+        "sections": compared_sections
+    }
@@ -0,0 +1,329 @@
+import logging
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from amounts import find_amounts
+from enhanced_analyzer import ANALYSIS_PATTERNS
+from sentence_index import SentenceIndex
+
+logger = logging.getLogger(__name__)
+
+# Section holding a document's whole extracted text, searched along with
+# the analysis sections (see enhanced_analyzer.ANALYSIS_PATTERNS)
+DOCUMENT_SECTION = 'document'
+
+# Kinds of waiting period recorded per document, checked in this order
+# against the sentence stating the period and then the one before it,
+# which usually holds the clause heading and its IRDAI exclusion code
+WAITING_PERIOD_KINDS = {
+    'pre_existing': re.compile(r'pre-?\s*existing|\(PED\)|Excl\s*0?1\b', re.IGNORECASE),
+    'specific': re.compile(r'specifi(?:ed|c)\s+(?:disease|waiting)|listed\s+conditions|Excl\s*0?2\b',
+                           re.IGNORECASE),
+    'initial': re.compile(r'initial|first\s+policy\s+commencement|30[\s-]*days?\s+waiting|Excl\s*0?3\b',
+                          re.IGNORECASE)
+}
+OTHER_WAITING_PERIOD = 'other'
+
+# A duration tied to a waiting period: "expiry of 24 months", "waiting
+# period of 2 years", "within 30 days from", "30-day waiting period"
+_WAITING_DURATION = re.compile(
+    r'(?:expiry\s+of|waiting\s+period\s+of|within)\s+(\d+)\s*(day|month|year)s?'
+    r'|(\d+)[\s-]*(day|month|year)s?[\s-]+waiting\s+period',
+    re.IGNORECASE
+)
+_MONTHS_PER_UNIT = {'day': 1 / 30, 'month': 1, 'year': 12}
+
+# Rupee amounts (see amounts.find_amounts) shortly after "Sum Insured".
+# Figures under a lakh in the same table rows are premiums and
+# co-payments, not sums insured.
+_SUM_INSURED = re.compile(r'Sum\s+Insured', re.IGNORECASE)
+_SUM_INSURED_WINDOW = 150
+MIN_SUM_INSURED = 100000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    document_id TEXT PRIMARY KEY,
+    filename TEXT,
+    insurer TEXT,
+    analyzer_version TEXT,
+    indexed_at REAL
+);
+CREATE TABLE IF NOT EXISTS sum_insured (
+    document_id TEXT NOT NULL,
+    amount INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sum_insured_amount ON sum_insured (amount, document_id);
+CREATE TABLE IF NOT EXISTS waiting_periods (
+    document_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    months REAL NOT NULL,
+    text TEXT
+);
+CREATE INDEX IF NOT EXISTS waiting_periods_kind ON waiting_periods (kind, document_id, months);
+CREATE VIRTUAL TABLE IF NOT EXISTS sections USING fts5(
+    document_id UNINDEXED,
+    section UNINDEXED,
+    content
+);
+"""
+
+
+def extract_sum_insured(text):
+    """Return the sorted distinct sums insured, in rupees, stated in text:
+    the amounts starting within _SUM_INSURED_WINDOW characters after a "Sum
+    Insured" heading."""
+    import numpy as np
+
+    heading_ends = np.array([heading.end() for heading in _SUM_INSURED.finditer(text)], dtype=np.int64)
+    if not len(heading_ends):
+        return []
+    values, starts, _ = find_amounts(text)
+    # Distance of each amount from the nearest heading ending before it
+    nearest = np.searchsorted(heading_ends, starts, side='right') - 1
+    distance = starts - heading_ends[np.maximum(nearest, 0)]
+    in_window = (nearest >= 0) & (distance < _SUM_INSURED_WINDOW)
+    values = values[in_window & (values >= MIN_SUM_INSURED)]
+    return [int(amount) for amount in np.unique(np.round(values))]
+
+
+def extract_waiting_periods(text):
+    """Return the waiting periods stated in text as a list of
+    {"kind", "months", "text"} dicts in document order.
+
+    kind is one of WAITING_PERIOD_KINDS or OTHER_WAITING_PERIOD; text is
+    the sentence stating the period.
+    """
+    index = SentenceIndex(text)
+    periods = []
+    for sentence_id in index.candidates([('waiting period', 'excluded', 'expiry')]):
+        start, end = index.span(sentence_id)
+        durations = list(_WAITING_DURATION.finditer(text, start, end))
+        if not durations:
+            continue
+
+        sentence = text[start:end]
+        previous = text[slice(*index.span(sentence_id - 1))] if sentence_id else ''
+        kind = next((kind for context in (sentence, previous)
+                     for kind, pattern in WAITING_PERIOD_KINDS.items() if pattern.search(context)),
+                    OTHER_WAITING_PERIOD)
+
+        for duration in durations:
+            count = duration.group(1) or duration.group(3)
+            unit = (duration.group(2) or duration.group(4)).lower()
+            periods.append({
+                "kind": kind,
+                "months": round(int(count) * _MONTHS_PER_UNIT[unit], 2),
+                "text": ' '.join(sentence.split())
+            })
+    return periods
+
+
+def _section_texts(text, analysis):
+    """Yield (section, text) for each analysis section with matches, and
+    for the whole document. A section's text holds one match per line."""
+    for section_id, section in analysis["sections"].items():
+        if "categories" in section:
+            matches = [match for category in section["categories"].values() for match in category["matches"]]
+        else:
+            matches = section["matches"]
+        if matches:
+            yield section_id, '\n'.join(' '.join(match["text"].split()) for match in matches)
+    yield DOCUMENT_SECTION, text
+
+
+def _summary_value(summary, item_id):
+    for section in summary["sections"].values():
+        for item in section["items"]:
+            if item["id"] == item_id and "value" in item:
+                return item["value"]["text"]
+    return None
+
+
+def _match_query(query):
+    """Turn free text into an FTS5 query requiring every word, so
+    punctuation in user input is never read as query syntax."""
+    return ' '.join('"' + word.replace('"', '""') + '"' for word in query.split())
+
+
+class CorpusIndex:
+    """Searchable index of every processed policy, kept in SQLite.
+
+    Each document is stored under its document id (the content hash of the
+    PDF) with its insurer, the sums insured and waiting periods it states,
+    and the text of each analysis section in a full-text (FTS5) table, so
+    the corpus can be queried without parsing any PDF again. The database
+    file may be shared by all gunicorn workers. It is created on first
+    use, not when the index is constructed.
+    """
+
+    def __init__(self, db_path, timeout=10.0):
+        self.db_path = db_path
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=self.timeout)
+        db.row_factory = sqlite3.Row
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    try:
+                        # WAL lets workers keep reading while one of them writes
+                        db.execute('PRAGMA journal_mode=WAL')
+                        db.executescript(_SCHEMA)
+                    except BaseException:
+                        db.close()
+                        raise
+                    self._schema_ready = True
+        return db
+
+    def add(self, document_id, text, result, filename=None, analyzer_version=None):
+        """Index a document from its extracted text and its full
+        app.process_pdf result, replacing any earlier entry for it."""
+        insurer = _summary_value(result["summary"], 'insurer')
+        amounts = extract_sum_insured(text)
+        periods = extract_waiting_periods(text)
+        sections = list(_section_texts(text, result["analysis"]))
+
+        with self._lock, closing(self._connect()) as db, db:
+            for table in ('documents', 'sum_insured', 'waiting_periods', 'sections'):
+                db.execute(f"DELETE FROM {table} WHERE document_id = ?", (document_id,))
+            db.execute(
+                "INSERT INTO documents (document_id, filename, insurer, analyzer_version, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (document_id, filename, insurer, analyzer_version, time.time())
+            )
+            db.executemany("INSERT INTO sum_insured (document_id, amount) VALUES (?, ?)",
+                           [(document_id, amount) for amount in amounts])
+            db.executemany(
+                "INSERT INTO waiting_periods (document_id, kind, months, text) VALUES (?, ?, ?, ?)",
+                [(document_id, period["kind"], period["months"], period["text"]) for period in periods]
+            )
+            db.executemany("INSERT INTO sections (document_id, section, content) VALUES (?, ?, ?)",
+                           [(document_id, section, content) for section, content in sections])
+        logger.info(f"Indexed document {document_id}: {len(amounts)} sums insured, "
+                    f"{len(periods)} waiting periods, {len(sections)} sections")
+
+    def search(self, query=None, section=None, insurer=None, min_sum_insured=None, max_sum_insured=None,
+               waiting_period=None, max_waiting_months=None, limit=20):
+        """Return the indexed documents matching every given criterion.
+
+        - query: words that must all occur in one section's text (in the
+          given section only, if set); results are then ranked by relevance
+          and carry a snippet per matching section
+        - section: an ANALYSIS_PATTERNS section id, or DOCUMENT_SECTION
+          for the whole text
+        - insurer: case-insensitive substring of the insurer's name
+        - min_sum_insured / max_sum_insured: some sum insured in that range
+        - waiting_period: a WAITING_PERIOD_KINDS kind (or "other") the
+          document states; with max_waiting_months, its longest period of
+          that kind is at most this long
+        - max_waiting_months alone: some waiting period is at most this long
+
+        Raises ValueError for an unknown section or waiting period kind.
+        """
+        if section is not None and section not in (*ANALYSIS_PATTERNS, DOCUMENT_SECTION):
+            raise ValueError(f"Unknown section: {section}. "
+                             f"Choose from: {', '.join((*ANALYSIS_PATTERNS, DOCUMENT_SECTION))}")
+        if waiting_period is not None and waiting_period not in (*WAITING_PERIOD_KINDS, OTHER_WAITING_PERIOD):
+            raise ValueError(f"Unknown waiting period: {waiting_period}. "
+                             f"Choose from: {', '.join((*WAITING_PERIOD_KINDS, OTHER_WAITING_PERIOD))}")
+
+        match = _match_query(query) if query else ''
+        section_filter = " AND section = ?" if section else ""
+        match_params = [match] + ([section] if section else [])
+
+        conditions = []
+        params = []
+        order = "d.indexed_at DESC"
+        if match:
+            conditions.append("d.document_id IN (SELECT document_id FROM sections "
+                              f"WHERE sections MATCH ?{section_filter})")
+            params.extend(match_params)
+            order = (f"(SELECT MIN(rank) FROM sections WHERE sections MATCH ?{section_filter} "
+                     "AND sections.document_id = d.document_id)")
+        if insurer:
+            conditions.append("d.insurer LIKE ? ESCAPE '\\'")
+            params.append('%' + re.sub(r'([%_\\])', r'\\\1', insurer) + '%')
+        if min_sum_insured is not None or max_sum_insured is not None:
+            conditions.append("EXISTS (SELECT 1 FROM sum_insured s WHERE s.document_id = d.document_id "
+                              "AND s.amount BETWEEN ? AND ?)")
+            params.extend([min_sum_insured if min_sum_insured is not None else 0,
+                           max_sum_insured if max_sum_insured is not None else 2 ** 63 - 1])
+        if waiting_period is not None and max_waiting_months is not None:
+            conditions.append("(SELECT MAX(months) FROM waiting_periods w WHERE w.document_id = d.document_id "
+                              "AND w.kind = ?) <= ?")
+            params.extend([waiting_period, max_waiting_months])
+        elif waiting_period is not None:
+            conditions.append("EXISTS (SELECT 1 FROM waiting_periods w WHERE w.document_id = d.document_id "
+                              "AND w.kind = ?)")
+            params.append(waiting_period)
+        elif max_waiting_months is not None:
+            conditions.append("EXISTS (SELECT 1 FROM waiting_periods w WHERE w.document_id = d.document_id "
+                              "AND w.months <= ?)")
+            params.append(max_waiting_months)
+
+        sql = "SELECT d.* FROM documents d"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY {order} LIMIT ?"
+        if match:
+            params.extend(match_params)
+        params.append(limit)
+
+        with closing(self._connect()) as db:
+            rows = db.execute(sql, params).fetchall()
+            return [self._describe(db, row, match, section) for row in rows]
+
+    def _describe(self, db, row, match='', section=None):
+        document_id = row["document_id"]
+        waiting_periods = {}
+        for kind, months in db.execute(
+                "SELECT kind, MAX(months) FROM waiting_periods WHERE document_id = ? GROUP BY kind",
+                (document_id,)):
+            waiting_periods[kind] = months
+        document = {
+            "document_id": document_id,
+            "filename": row["filename"],
+            "insurer": row["insurer"],
+            "sum_insured": [amount for (amount,) in db.execute(
+                "SELECT amount FROM sum_insured WHERE document_id = ? ORDER BY amount", (document_id,))],
+            "waiting_periods": waiting_periods,
+            "analyzer_version": row["analyzer_version"],
+            "indexed_at": row["indexed_at"]
+        }
+        if match:
+            section_filter = " AND section = ?" if section else ""
+            params = [match, document_id] + ([section] if section else [])
+            document["matches"] = [
+                {"section": match_section, "snippet": snippet}
+                for match_section, snippet in db.execute(
+                    "SELECT section, snippet(sections, 2, '[', ']', '...', 16) FROM sections "
+                    f"WHERE sections MATCH ? AND document_id = ?{section_filter} ORDER BY rank LIMIT 3",
+                    params)
+            ]
+        return document
+
+    def get(self, document_id):
+        """Return the indexed description of a document, or None."""
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT * FROM documents WHERE document_id = ?", (document_id,)).fetchone()
+            return self._describe(db, row) if row else None
+
+    def section_texts(self, document_id):
+        """Return the indexed text of each analysis section of a document
+        that had matches, one match per line."""
+        with closing(self._connect()) as db:
+            return {section: content for section, content in db.execute(
+                "SELECT section, content FROM sections WHERE document_id = ? AND section != ?",
+                (document_id, DOCUMENT_SECTION))}
+
+    def stats(self):
+        """Return the number of indexed documents."""
+        with closing(self._connect()) as db:
+            return {"documents": db.execute("SELECT COUNT(*) FROM documents").fetchone()[0]}
@@ -1,15 +1,118 @@
-import PyPDF2
 import re
-import nltk
-from nltk.tokenize import sent_tokenize
 import os
 import sys
+import time
 from datetime import datetime
+from amounts import parse_amounts
+from enhanced_analyzer import MAX_SENTENCE_CHARS, iter_cached_pdf_pages, iter_pdf_pages
+from sentence_index import SentenceIndex
+
+# Seconds DocumentAnalyzer may spend matching one document's patterns.
+# Sections still unmatched when it runs out are reported as truncated.
+ANALYSIS_TIME_BUDGET = float(os.environ.get('ANALYSIS_TIME_BUDGET', 10))
+
+# Patterns searched by DocumentAnalyzer.analyze_text, by the list of
+# matches they produce (re.findall results).
+#
+# "Keyword ... other word ... up to the period" patterns are written so
+# that each start position is matched in time linear in MAX_SENTENCE_CHARS:
+# runs are bounded, the search for the second word runs once (in a
+# lookahead, or an atomic group when it decides where the match ends) and
+# the run to the end of the sentence is possessive, so a failed match is
+# never retried at every earlier split of the run. Within those bounds the
+# matches are the same as those of the plain [^.]*? / [^.]+ patterns.
+_R = f'{{0,{MAX_SENTENCE_CHARS}}}'
+_R1 = f'{{1,{MAX_SENTENCE_CHARS}}}'
+
+REPORT_PATTERNS = {
+    'policy_details': re.compile(rf'(Star Health Premier Insurance Policy(?=[^\n]{_R}?(?:Limited|Ltd))[^\n]{_R}+)(?=\n)'),
+    # The amount is captured with its lakh or crore unit, if any
+    'sum_insured': re.compile(r'Sum\s+Insured\s*+(?:(?:of|is)\s*+)?Rs\.?\s*+'
+                              r'([\d,]++(?:\.\d{2})?(?:\s*+(?:[Ll]akhs?|[Cc]rores?))?)\s*(?:/-)?'),
+    'coverage_breakdown': re.compile(rf'(?:coverage|sum insured)\s+(?:for|of)\s+([^.]{_R1}?)(?=\.|and)'),
+    'eligibility': re.compile(rf'Eligibility(?=[^.]{_R}?(?:years?|age)[^.])[^.]{_R1}+\.'),
+    'additional_eligibility': re.compile(rf'(?:eligible|qualify)\s+for\s+([^.]{_R1}?)(?=\.|and)'),
+    'benefits': re.compile(rf'(?:Medical [Ee]xpenses|[Tt]reatment|[Cc]overage)\s+(?:for|of|includes?)\s+([^.]{_R1}?)(?=\.|and)'),
+    'waiting_periods': re.compile(rf'(?:waiting period|shall be excluded)(?=[^.]{_R}?\d++\s++(?:days?|months?|years?)[^.])[^.]{_R1}+\.'),
+    'exceptions': re.compile(rf'(?:exception|excluded from waiting period)(?=[^.]{_R}?(?:condition|disease)[^.])[^.]{_R1}+'),
+    # "expenses" only keeps its "s" if the sentence can end after it, as
+    # backtracking into "expense" would otherwise let the "s" start the tail
+    'exclusions': re.compile(rf'(?:Exclusions?|not covered|excluded)(?>[^.]{_R}?(?:following|expense(?:s(?=[^.][^.\n]{_R}[.\n]))?|treatment)[^.])[^.\n]{_R}+[.\n]'),
+    'features': re.compile(rf'(?:Features?|Benefits?)(?=[^.]{_R}?(?:provides?|includes?|offers?)[^.])[^.]{_R1}+\.'),
+    'discounts': re.compile(rf'(?:discount|reduction)(?=[^.]{_R}?(?:\d++%|percent)[^.])[^.]{_R1}+\.'),
+    'discount_conditions': re.compile(rf'(?:condition|requirement)\s+for\s+discount(?=[^.]{_R}?(?:policy|premium)[^.])[^.]{_R1}+'),
+    'claims_info': re.compile(rf'(?:claim|claims process)(?=[^.]{_R}?(?:document|submit|process)[^.])[^.]{_R1}+'),
+    'documents': re.compile(rf'(?:document|paper|proof)\s+required(?=[^.]{_R}?(?:claim|submission)[^.])[^.]{_R1}+'),
+    'contact_info': re.compile(rf'(?:contact|helpline|toll free)(?=[^.]{_R}?(?:number|email)[^.])[^.]{_R1}+')
+}
+
+# Keywords every match of a sentence-bounded REPORT_PATTERNS pattern
+# contains: one of each group, the most selective group first. These
+# patterns are only run on the sentences of a SentenceIndex that contain
+# them. Patterns whose matches can contain a period before their last
+# character (policy_details, sum_insured's "Rs.") must not be listed and
+# are run over the whole text.
+REPORT_KEYWORDS = {
+    'coverage_breakdown': [('coverage', 'sum insured')],
+    'eligibility': [('Eligibility',), ('year', 'age')],
+    'additional_eligibility': [('eligible', 'qualify')],
+    'benefits': [('Medical Expenses', 'Treatment', 'Coverage')],
+    'waiting_periods': [('waiting period', 'shall be excluded'), ('day', 'month', 'year')],
+    'exceptions': [('exception', 'excluded from waiting period'), ('condition', 'disease')],
+    'exclusions': [('Exclusion', 'not covered', 'excluded'), ('following', 'expense', 'treatment')],
+    'features': [('Feature', 'Benefit'), ('provide', 'include', 'offer')],
+    'discounts': [('discount', 'reduction')],
+    'discount_conditions': [('condition', 'requirement'), ('discount',), ('policy', 'premium')],
+    'claims_info': [('claim',), ('document', 'submit', 'process')],
+    'documents': [('document', 'paper', 'proof'), ('required',), ('claim', 'submission')],
+    'contact_info': [('contact', 'helpline', 'toll free'), ('number', 'email')]
+}
+
+def find_report_matches(text, deadline=None):
+    """Return (matches, truncated) for the REPORT_PATTERNS patterns in text.
+
+    matches maps each pattern name to what re.findall would return. With a
+    deadline (a time.monotonic() value), matching stops once it has passed,
+    checked after every match and before every candidate sentence: the
+    current pattern keeps the matches found so far, later patterns find
+    nothing, and truncated lists every pattern whose matches may be
+    incomplete.
+
+    The text is split into sentences once and the REPORT_KEYWORDS patterns
+    are only run on the sentences containing their keywords.
+    """
+    index = SentenceIndex(text)
+    matches = {}
+    truncated = []
+    for name, pattern in REPORT_PATTERNS.items():
+        found = matches[name] = []
+        if name in REPORT_KEYWORDS:
+            spans = (index.span(i) for i in index.candidates(REPORT_KEYWORDS[name]))
+        else:
+            spans = [(0, len(text))]
+        # Checked per sentence too, so a pattern scanning many sentences
+        # without a match is still cut short
+        expired = False
+        for start, end in spans:
+            expired = deadline is not None and time.monotonic() >= deadline
+            if expired:
+                break
+            for match in pattern.finditer(text, start, end):
+                found.append(match.group(1) if pattern.groups else match.group(0))
+                expired = deadline is not None and time.monotonic() >= deadline
+                if expired:
+                    break
+            if expired:
+                break
+        if expired:
+            truncated.append(name)
+    return matches, truncated
 
 class DocumentAnalyzer:
     def __init__(self, file_path):
         self.file_path = os.path.abspath(file_path)
         self.text_content = ""
+        self.page_matches = None
         self.analysis_results = []
         
         # Check if file exists
@@ -21,38 +124,70 @@ class DocumentAnalyzer:
         print(f"Processing PDF file: {self.file_path}")
         print(f"File size: {file_size / 1024:.2f} KB")
 
-    def extract_text(self):
-        """Extract text from PDF file."""
+    def extract_text(self, workers=None, backend=None, page_cache=None):
+        """Extract text from PDF file.
+
+        backend selects the extraction library (see pdf_backends). Long
+        documents are extracted across a process pool of the given size
+        (see enhanced_analyzer.iter_pdf_pages); 1 disables it.
+
+        With a page_cache (a result_cache.ResultCache), pages seen before are
+        not extracted again and their report matches are reused by
+        analyze_text, so only new or changed pages are analyzed (see
+        enhanced_analyzer.iter_cached_pdf_pages). Matching new pages shares
+        one ANALYSIS_TIME_BUDGET, which extraction does not count against;
+        pages cut short by it are not cached.
+        """
         try:
-            with open(self.file_path, 'rb') as file:
-                # Create PDF reader object
-                pdf_reader = PyPDF2.PdfReader(file)
-                
-                # Print total pages
-                print(f"Total pages in PDF: {len(pdf_reader.pages)}")
-                
-                # Reset text content
-                self.text_content = ""
-                
-                # Extract text from each page
-                for page_num in range(len(pdf_reader.pages)):
-                    page = pdf_reader.pages[page_num]
-                    text = page.extract_text()
-                    
-                    # Print page stats
-                    print(f"Page {page_num + 1}: {len(text)} characters")
-                    
-                    if text.strip():
-                        self.text_content += text + "\n"
-                    else:
-                        print(f"Warning: Page {page_num + 1} contains no text")
-                
-                # Print total extracted text stats
-                print(f"Total extracted text length: {len(self.text_content)}")
-                print("First 200 characters of extracted text:")
-                print(self.text_content[:200])
-                
-                return True
+            pages = []
+            page_count = 0
+
+            if page_cache is None:
+                self.page_matches = None
+                page_results = ((page_num, text, None) for page_num, text in
+                                iter_pdf_pages(self.file_path, workers=workers, backend=backend))
+            else:
+                self.page_matches = []
+                remaining = ANALYSIS_TIME_BUDGET
+
+                def match_page(page_text):
+                    # Only the time spent matching is taken from the budget
+                    nonlocal remaining
+                    start = time.monotonic()
+                    matches, truncated = find_report_matches(page_text, start + remaining)
+                    remaining -= time.monotonic() - start
+                    return {"matches": matches, "truncated": truncated}
+
+                page_results = iter_cached_pdf_pages(self.file_path, page_cache, match_page, 'document',
+                                                     workers=workers, backend=backend,
+                                                     cacheable=lambda result: not result["truncated"])
+
+            # Extract text from each page
+            for page_num, text, matches in page_results:
+                page_count = page_num
+
+                # Print page stats
+                print(f"Page {page_num}: {len(text)} characters")
+
+                if text.strip():
+                    pages.append(text + "\n")
+                    if matches is not None:
+                        self.page_matches.append(matches)
+                else:
+                    print(f"Warning: Page {page_num} contains no text")
+
+            # Print total pages
+            print(f"Total pages in PDF: {page_count}")
+
+            # Join once instead of growing the string page by page
+            self.text_content = "".join(pages)
+
+            # Print total extracted text stats
+            print(f"Total extracted text length: {len(self.text_content)}")
+            print("First 200 characters of extracted text:")
+            print(self.text_content[:200])
+
+            return True
         except Exception as e:
             print(f"Error extracting text: {str(e)}")
             import traceback
@@ -291,7 +426,16 @@ class DocumentAnalyzer:
             return None
 
     def analyze_text(self):
-        """Analyze the text content for key policy information."""
+        """Analyze the text content for key policy information.
+
+        If extract_text was given a page cache, the per-page matches it
+        collected are merged instead of searching the whole text again. Each
+        page is then searched on its own, so a match never runs across a page
+        break.
+
+        Searching stops after ANALYSIS_TIME_BUDGET seconds; the report then
+        ends with a note naming the sections that may be incomplete.
+        """
         try:
             # Use original text content for analysis
             text = self.text_content
@@ -299,6 +443,19 @@ class DocumentAnalyzer:
             if not text.strip():
                 print("Error: No text to analyze")
                 return False
+
+            if self.page_matches is None:
+                matches, truncated = find_report_matches(text, time.monotonic() + ANALYSIS_TIME_BUDGET)
+            else:
+                matches = {name: [] for name in REPORT_PATTERNS}
+                truncated = []
+                for page_result in self.page_matches:
+                    for name, page_found in page_result["matches"].items():
+                        matches[name].extend(page_found)
+                    truncated.extend(name for name in page_result["truncated"] if name not in truncated)
+            if truncated:
+                print(f"Warning: analysis time budget of {ANALYSIS_TIME_BUDGET}s exceeded; "
+                      f"incomplete sections: {', '.join(truncated)}")
             
             # Initialize analysis results with header
             analysis = [
@@ -310,29 +467,33 @@ class DocumentAnalyzer:
             ]
             
             # Extract policy details
-            policy_details = re.search(r'(Star Health Premier Insurance Policy.*?(?:Limited|Ltd).*?)(?=\n)', text)
+            policy_details = matches['policy_details']
             if policy_details:
                 analysis.extend([
                     "1. POLICY OVERVIEW",
                     "-" * 30,
-                    f"Policy Name: {policy_details.group(1).strip()}",
+                    f"Policy Name: {policy_details[0].strip()}",
                     ""
                 ])
             
             # Extract sum insured options with detailed breakdown
-            sum_insured = re.findall(r'Sum\s+Insured\s*(?:of|is)?\s*Rs\.?\s*([\d,]+(?:,\d+)*(?:\.\d{2})?)\s*(?:lakhs?|Lakhs?|/-)?', text)
+            sum_insured = matches['sum_insured']
             if sum_insured:
                 analysis.extend([
                     "2. COVERAGE AMOUNTS",
                     "-" * 30,
                 ])
                 
-                unique_amounts = sorted(list(set(sum_insured)), key=lambda x: float(x.replace(',', '')), reverse=True)
+                unique_amounts = list(dict.fromkeys(sum_insured))
+                # Largest first, in rupees; amounts that hold no figure (a
+                # stray ",") last
+                values = parse_amounts(unique_amounts)
+                unique_amounts = [unique_amounts[i] for i in (-values).argsort(kind='stable')]
                 for amount in unique_amounts[:5]:
                     analysis.append(f"- Rs. {amount}")
                 
                 # Add coverage breakdown
-                coverage_breakdown = re.findall(r'(?:coverage|sum insured)\s+(?:for|of)\s+([^.]+?)(?=\.|and)', text)
+                coverage_breakdown = matches['coverage_breakdown']
                 if coverage_breakdown:
                     analysis.append("\nCoverage Breakdown:")
                     for detail in coverage_breakdown[:3]:
@@ -340,7 +501,7 @@ class DocumentAnalyzer:
                 analysis.append("")
             
             # Extract eligibility criteria with detailed requirements
-            eligibility = re.findall(r'Eligibility[^.]*(?:years?|age)[^.]+\.', text)
+            eligibility = matches['eligibility']
             if eligibility:
                 analysis.extend([
                     "3. ELIGIBILITY REQUIREMENTS",
@@ -352,7 +513,7 @@ class DocumentAnalyzer:
                     analysis.append(f"- {criteria.strip()}")
                 
                 # Add additional eligibility details
-                additional_eligibility = re.findall(r'(?:eligible|qualify)\s+for\s+([^.]+?)(?=\.|and)', text)
+                additional_eligibility = matches['additional_eligibility']
                 if additional_eligibility:
                     analysis.append("\nAdditional Eligibility Criteria:")
                     for detail in additional_eligibility[:2]:
@@ -360,7 +521,7 @@ class DocumentAnalyzer:
                 analysis.append("")
             
             # Extract key benefits with detailed descriptions
-            benefits = re.findall(r'(?:Medical [Ee]xpenses|[Tt]reatment|[Cc]overage)\s+(?:for|of|includes?)\s+([^.]+?)(?=\.|and)', text)
+            benefits = matches['benefits']
             if benefits:
                 analysis.extend([
                     "4. BENEFITS AND COVERAGE",
@@ -399,7 +560,7 @@ class DocumentAnalyzer:
                 analysis.append("")
             
             # Extract waiting periods with detailed explanations
-            waiting_periods = re.findall(r'(?:waiting period|shall be excluded)[^.]*?(?:\d+\s+(?:days?|months?|years?))[^.]+\.', text)
+            waiting_periods = matches['waiting_periods']
             if waiting_periods:
                 analysis.extend([
                     "5. WAITING PERIODS",
@@ -411,7 +572,7 @@ class DocumentAnalyzer:
                     analysis.append(f"- {period.strip()}")
                 
                 # Add waiting period exceptions
-                exceptions = re.findall(r'(?:exception|excluded from waiting period)[^.]*?(?:condition|disease)[^.]+', text)
+                exceptions = matches['exceptions']
                 if exceptions:
                     analysis.append("\nWaiting Period Exceptions:")
                     for exception in exceptions[:2]:
@@ -419,7 +580,7 @@ class DocumentAnalyzer:
                 analysis.append("")
             
             # Extract exclusions with detailed explanations
-            exclusions = re.findall(r'(?:Exclusions?|not covered|excluded)[^.]*?(?:following|expenses?|treatment)[^.]+?(?:\.|\n)', text)
+            exclusions = matches['exclusions']
             if exclusions:
                 analysis.extend([
                     "6. EXCLUSIONS AND LIMITATIONS",
@@ -455,7 +616,7 @@ class DocumentAnalyzer:
                 analysis.append("")
             
             # Extract special features with detailed descriptions
-            features = re.findall(r'(?:Features?|Benefits?)[^.]*?(?:provides?|includes?|offers?)[^.]+\.', text)
+            features = matches['features']
             if features:
                 analysis.extend([
                     "7. SPECIAL FEATURES",
@@ -491,7 +652,7 @@ class DocumentAnalyzer:
                 analysis.append("")
             
             # Extract premium discounts with detailed explanations
-            discounts = re.findall(r'(?:discount|reduction)[^.]*?(?:\d+%|percent)[^.]+\.', text)
+            discounts = matches['discounts']
             if discounts:
                 analysis.extend([
                     "8. PREMIUM DISCOUNTS",
@@ -503,7 +664,7 @@ class DocumentAnalyzer:
                     analysis.append(f"- {discount.strip()}")
                 
                 # Add discount conditions
-                discount_conditions = re.findall(r'(?:condition|requirement)\s+for\s+discount[^.]*?(?:policy|premium)[^.]+', text)
+                discount_conditions = matches['discount_conditions']
                 if discount_conditions:
                     analysis.append("\nDiscount Conditions:")
                     for condition in discount_conditions[:2]:
@@ -511,7 +672,7 @@ class DocumentAnalyzer:
                 analysis.append("")
             
             # Add claims process information
-            claims_info = re.findall(r'(?:claim|claims process)[^.]*?(?:document|submit|process)[^.]+', text)
+            claims_info = matches['claims_info']
             if claims_info:
                 analysis.extend([
                     "9. CLAIMS PROCESS",
@@ -523,7 +684,7 @@ class DocumentAnalyzer:
                     analysis.append(f"- {claim.strip()}")
                 
                 # Add required documents
-                documents = re.findall(r'(?:document|paper|proof)\s+required[^.]*?(?:claim|submission)[^.]+', text)
+                documents = matches['documents']
                 if documents:
                     analysis.append("\nRequired Documents:")
                     for doc in documents[:3]:
@@ -531,7 +692,7 @@ class DocumentAnalyzer:
                 analysis.append("")
             
             # Add contact information
-            contact_info = re.findall(r'(?:contact|helpline|toll free)[^.]*?(?:number|email)[^.]+', text)
+            contact_info = matches['contact_info']
             if contact_info:
                 analysis.extend([
                     "10. CONTACT INFORMATION",
@@ -541,6 +702,13 @@ class DocumentAnalyzer:
                 unique_contacts = list(set(contact_info))
                 for contact in unique_contacts[:3]:
                     analysis.append(f"- {contact.strip()}")
+
+            if truncated:
+                analysis.extend([
+                    "",
+                    f"Note: analysis stopped after {ANALYSIS_TIME_BUDGET:g} seconds; these sections may be "
+                    f"incomplete: {', '.join(truncated)}",
+                ])
             
             # Save analysis results
             self.analysis_results = analysis
@@ -1,94 +1,189 @@
+import bisect
+import functools
+import io
+import itertools
+import multiprocessing
 import re
 from datetime import datetime
-import PyPDF2
 import os
-
-def extract_text_from_pdf(pdf_path):
-    """Extract text from PDF file."""
-    text = ""
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pdf_backends import get_backend, normalize_page_text
+
+# Bump whenever extraction or analysis output changes so cached results
+# produced by an older version are not served.
+ANALYZER_VERSION = "5"
+
+# Parallel extraction settings. Documents with fewer pages than the threshold
+# are always extracted in the calling process.
+EXTRACTION_WORKERS = int(os.environ.get('EXTRACTION_WORKERS', os.cpu_count() or 1))
+PARALLEL_EXTRACTION_MIN_PAGES = int(os.environ.get('PARALLEL_EXTRACTION_MIN_PAGES', 40))
+
+# Longest run of sentence text a pattern looks ahead through for a second
+# keyword. Anything longer is a table or an OCR block without periods.
+MAX_SENTENCE_CHARS = 1000
+
+_extraction_pool = None
+_extraction_pool_workers = 0
+_extraction_pool_lock = threading.Lock()
+
+def _get_extraction_pool(workers):
+    """Return the shared extraction process pool, creating it on first use."""
+    global _extraction_pool, _extraction_pool_workers
+    with _extraction_pool_lock:
+        if _extraction_pool is None or _extraction_pool_workers != workers:
+            if _extraction_pool is not None:
+                _extraction_pool.shutdown(wait=False)
+            # Not forked: the pool is started from a request thread, and a
+            # fork would copy locks that other threads hold at that moment
+            start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _extraction_pool = ProcessPoolExecutor(max_workers=workers,
+                                                   mp_context=multiprocessing.get_context(start_method))
+            _extraction_pool_workers = workers
+        return _extraction_pool
+
+def _extract_pages(pdf_source, indexes, backend_name):
+    """Extract the text of the pages at indexes in a pool worker."""
+    backend = get_backend(backend_name)
+    return [normalize_page_text(text) for text in backend.iter_selected_pages(pdf_source, indexes)]
+
+def _iter_page_texts(pdf_source, indexes, workers, backend):
+    """Yield the normalised text of the pages at indexes, in order.
+
+    At least PARALLEL_EXTRACTION_MIN_PAGES pages are split into contiguous
+    chunks extracted across the process pool.
+    """
+    if workers <= 1 or len(indexes) < PARALLEL_EXTRACTION_MIN_PAGES:
+        for page_text in backend.iter_selected_pages(pdf_source, indexes):
+            yield normalize_page_text(page_text)
+        return
+
+    # Each worker re-opens the document, so only the source (a path, or the
+    # bytes of an in-memory upload) and page indexes cross the process boundary
+    chunk_size = -(-len(indexes) // workers)
+    chunks = [indexes[i:i + chunk_size] for i in range(0, len(indexes), chunk_size)]
+    pool = _get_extraction_pool(workers)
+    for chunk in pool.map(_extract_pages, [pdf_source] * len(chunks), chunks,
+                          [backend.name] * len(chunks)):
+        yield from chunk
+
+def iter_pdf_pages(pdf_source, workers=None, backend=None):
+    """Yield (page_number, text) for each page of a PDF, one page at a time.
+
+    pdf_source is a file path or the PDF's bytes.
+
+    Page numbers start at 1. Only the current page's text is held, so callers
+    that process pages incrementally never need the whole document in memory.
+
+    backend names a pdf_backends backend (default: PDF_BACKEND, PyMuPDF);
+    page text is normalised the same way whichever backend is used.
+
+    Long documents are split into contiguous page ranges extracted across a
+    process pool; pages are still yielded in document order. workers defaults
+    to EXTRACTION_WORKERS, and 1 forces single-process extraction.
+    """
+    workers = EXTRACTION_WORKERS if workers is None else workers
+    backend = get_backend(backend)
+
+    page_count = backend.page_count(pdf_source) if workers > 1 else 0
+    if page_count < PARALLEL_EXTRACTION_MIN_PAGES:
+        for page_number, page_text in enumerate(backend.iter_pages(pdf_source), start=1):
+            yield page_number, normalize_page_text(page_text)
+        return
+
+    page_texts = _iter_page_texts(pdf_source, list(range(page_count)), workers, backend)
+    for page_number, page_text in enumerate(page_texts, start=1):
+        yield page_number, page_text
+
+def iter_cached_pdf_pages(pdf_source, page_cache, analyze_page, namespace, workers=None, backend=None,
+                          cacheable=None, on_timing=None):
+    """Yield (page_number, text, page_result) for each page of a PDF,
+    reusing page_cache for pages that were processed before.
+
+    Pages are keyed by a digest of their content stream (see
+    pdf_backends.page_digests), computed without extracting any text, so
+    a republished document only has its new or changed pages extracted
+    and passed to analyze_page(text). The JSON-serialisable result is
+    cached with the page text; namespace names the analysis so different
+    analyzers never share entries. page_cache is a result_cache.ResultCache.
+    A result for which cacheable(result) is false (e.g. one cut short by a
+    time budget) is yielded but not cached.
+
+    For each page that is not cached, on_timing('extraction', seconds) and
+    on_timing('analysis', seconds) are called with the time spent
+    extracting its text and passing it to analyze_page.
+    """
+    workers = EXTRACTION_WORKERS if workers is None else workers
+    backend = get_backend(backend)
+
+    keys = [f"page-v{ANALYZER_VERSION}-{namespace}-{backend.name}-{digest}"
+            for digest in backend.page_digests(pdf_source)]
+    entries = [page_cache.get(key) for key in keys]
+    missing = [i for i, entry in enumerate(entries) if entry is None]
+    page_texts = _iter_page_texts(pdf_source, missing, workers, backend)
+
+    for i, (key, entry) in enumerate(zip(keys, entries)):
+        if entry is None:
+            start = time.perf_counter()
+            page_text = next(page_texts)
+            extracted = time.perf_counter()
+            entry = {"text": page_text, "result": analyze_page(page_text)}
+            if on_timing:
+                on_timing('extraction', extracted - start)
+                on_timing('analysis', time.perf_counter() - extracted)
+            if cacheable is None or cacheable(entry["result"]):
+                page_cache.set(key, entry)
+        yield i + 1, entry["text"], entry["result"]
+
+def extract_text_from_pdf(pdf_path, workers=None, backend=None, on_page=None):
+    """Extract text from PDF file (a path, or the PDF's bytes).
+
+    on_page, if given, is called with (page_number, page_text) as each page
+    is extracted, e.g. to record progress or per-page timings.
+    """
+    pages = []
     try:
-        with open(pdf_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
+        for page_number, page_text in iter_pdf_pages(pdf_path, workers=workers, backend=backend):
+            if on_page:
+                on_page(page_number, page_text)
+            pages.append(page_text + "\n")
     except Exception as e:
         print(f"Error extracting text from PDF: {e}")
-    return text
-
-def analyze_text(text):
-    """Analyze the text and generate a detailed report."""
-    analysis = {
-        'policy_identification': [],
-        'company_details': [],
-        'coverage_details': [],
-        'eligibility_criteria': [],
-        'key_benefits': {
-            'hospitalization': [],
-            'treatment': [],
-            'medical': [],
-            'other': []
-        },
-        'waiting_periods': [],
-        'key_exclusions': {
-            'medical_conditions': [],
-            'treatments': [],
-            'general': []
-        },
-        'special_features': {
-            'discounts': [],
-            'additional_benefits': [],
-            'special_features': []
-        },
-        'claims_process': [],
-        'contact_info': []
-    }
-
-    # Policy Identification
-    policy_patterns = [
-        r'Policy\s+(?:Number|No\.?|ID)?\s*:?\s*([A-Z0-9-]+)',
+    # Join once instead of growing a string page by page
+    return "".join(pages)
+
+# Patterns searched by analyze_text, grouped by report section. Sections with
+# categories map category names to pattern lists. A pattern listed under
+# several sections is only scanned once (see _build_pattern_registry).
+ANALYSIS_PATTERNS = {
+    'policy_identification': [
+        # Whitespace runs are possessive wherever the next token cannot
+        # start with whitespace, so long blank runs are not re-split on
+        # every failed attempt
+        r'Policy\s++(?:(?:Number|No\.?|ID)\s*+)?(?::\s*+)?([A-Z0-9-]+)',
         r'Policy\s+Type\s*:?\s*([A-Za-z\s]+)',
         r'Policy\s+Period\s*:?\s*([A-Za-z0-9\s,]+)'
-    ]
-    for pattern in policy_patterns:
-        matches = re.finditer(pattern, text)
-        for match in matches:
-            analysis['policy_identification'].append(match.group(0))
-
-    # Company Details
-    company_patterns = [
-        r'([A-Za-z\s]+(?:Limited|Ltd\.?))\s+IRDAI\s+Reg\.?\s+No\.?\s*:?\s*(\d+)',
+    ],
+    'company_details': [
+        # The lookbehind only skips start positions inside a run of letters;
+        # a match can always start at the beginning of the run instead, so
+        # results are unchanged but the scan is no longer quadratic.
+        r'(?<![A-Za-z\s])([A-Za-z\s]+(?:Limited|Ltd\.?))\s+IRDAI\s+Reg\.?\s+No\.?\s*:?\s*(\d+)',
         r'CIN\s*:?\s*([A-Z0-9]+)',
         r'Registered\s+Office\s*:?\s*([^\.]+)'
-    ]
-    for pattern in company_patterns:
-        matches = re.finditer(pattern, text)
-        for match in matches:
-            analysis['company_details'].append(match.group(0))
-
-    # Coverage Details
-    coverage_patterns = [
-        r'Sum\s+Insured\s+(?:range|options|from)?\s*:?\s*Rs\.?\s*([^.]+)',
+    ],
+    'coverage_details': [
+        r'Sum\s+Insured\s++(?:(?:range|options|from)\s*+)?(?::\s*+)?Rs\.?\s*([^.]+)',
         r'Coverage\s+for\s+([^\.]+)',
         r'Additional\s+Coverage\s+([^\.]+)'
-    ]
-    for pattern in coverage_patterns:
-        matches = re.finditer(pattern, text)
-        for match in matches:
-            analysis['coverage_details'].append(match.group(0))
-
-    # Eligibility Criteria
-    eligibility_patterns = [
+    ],
+    'eligibility_criteria': [
         r'Eligibility\s+Criteria\s*:?\s*([^\.]+)',
         r'Age\s+Limit\s*:?\s*([^\.]+)',
         r'Required\s+Documents\s*:?\s*([^\.]+)'
-    ]
-    for pattern in eligibility_patterns:
-        matches = re.finditer(pattern, text)
-        for match in matches:
-            analysis['eligibility_criteria'].append(match.group(0))
-
-    # Key Benefits
-    benefit_patterns = {
+    ],
+    'key_benefits': {
         'hospitalization': [
             r'Hospitalization\s+benefits\s+([^\.]+)',
             r'In-patient\s+care\s+([^\.]+)',
@@ -109,26 +204,13 @@ def analyze_text(text):
             r'Special\s+benefits\s+([^\.]+)',
             r'Value\s+added\s+services\s+([^\.]+)'
         ]
-    }
-    for category, patterns in benefit_patterns.items():
-        for pattern in patterns:
-            matches = re.finditer(pattern, text)
-            for match in matches:
-                analysis['key_benefits'][category].append(match.group(0))
-
-    # Waiting Periods
-    waiting_patterns = [
+    },
+    'waiting_periods': [
         r'Waiting\s+period\s+([^\.]+)',
         r'Initial\s+waiting\s+period\s+([^\.]+)',
         r'Pre-existing\s+disease\s+waiting\s+period\s+([^\.]+)'
-    ]
-    for pattern in waiting_patterns:
-        matches = re.finditer(pattern, text)
-        for match in matches:
-            analysis['waiting_periods'].append(match.group(0))
-
-    # Key Exclusions
-    exclusion_patterns = {
+    ],
+    'key_exclusions': {
         'medical_conditions': [
             r'Pre-existing\s+diseases\s+([^\.]+)',
             r'Chronic\s+conditions\s+([^\.]+)',
@@ -144,15 +226,8 @@ def analyze_text(text):
             r'Standard\s+exclusions\s+([^\.]+)',
             r'Common\s+exclusions\s+([^\.]+)'
         ]
-    }
-    for category, patterns in exclusion_patterns.items():
-        for pattern in patterns:
-            matches = re.finditer(pattern, text)
-            for match in matches:
-                analysis['key_exclusions'][category].append(match.group(0))
-
-    # Special Features
-    feature_patterns = {
+    },
+    'special_features': {
         'discounts': [
             r'Premium\s+discounts\s+([^\.]+)',
             r'Special\s+discounts\s+([^\.]+)',
@@ -168,279 +243,450 @@ def analyze_text(text):
             r'Unique\s+benefits\s+([^\.]+)',
             r'Exclusive\s+features\s+([^\.]+)'
         ]
-    }
-    for category, patterns in feature_patterns.items():
-        for pattern in patterns:
-            matches = re.finditer(pattern, text)
-            for match in matches:
-                analysis['special_features'][category].append(match.group(0))
-
-    # Claims Process
-    claims_patterns = [
+    },
+    'claims_process': [
         r'Claims\s+process\s+([^\.]+)',
         r'How\s+to\s+file\s+a\s+claim\s+([^\.]+)',
         r'Required\s+documents\s+for\s+claims\s+([^\.]+)'
-    ]
-    for pattern in claims_patterns:
-        matches = re.finditer(pattern, text)
-        for match in matches:
-            analysis['claims_process'].append(match.group(0))
-
-    # Contact Information
-    contact_patterns = [
+    ],
+    'contact_info': [
         r'Contact\s+number\s*:?\s*([^\.]+)',
         r'Email\s+address\s*:?\s*([^\.]+)',
         r'Toll\s+free\s+number\s*:?\s*([^\.]+)'
     ]
-    for pattern in contact_patterns:
-        matches = re.finditer(pattern, text)
-        for match in matches:
-            analysis['contact_info'].append(match.group(0))
+}
+
+def _leading_keyword(pattern):
+    """Return the literal word every match of pattern starts with, if any."""
+    keyword = re.match(r'[A-Za-z-]+(?=\\s)', pattern)
+    return keyword.group(0) if keyword else None
+
+def _build_pattern_registry(pattern_groups):
+    """Compile each distinct pattern once and record where its matches go.
+
+    Returns (patterns, targets, keyword_patterns, overlaps, scanner):
+    - patterns: list of (compiled pattern, leading keyword or None)
+    - targets: list of (section, category, pattern index) in report order
+    - keyword_patterns: keyword -> indexes of the patterns starting with it
+    - overlaps: keyword -> (offset, keyword) pairs that may also occur
+      inside or across a scanner hit for that keyword
+    - scanner: one regex finding keyword occurrences in a single pass
+    """
+    patterns = []
+    index_by_source = {}
+    targets = []
+
+    for section, group in pattern_groups.items():
+        categories = group.items() if isinstance(group, dict) else [(None, group)]
+        for category, sources in categories:
+            for source in sources:
+                if source not in index_by_source:
+                    index_by_source[source] = len(patterns)
+                    patterns.append((re.compile(source), _leading_keyword(source)))
+                targets.append((section, category, index_by_source[source]))
+
+    keyword_patterns = {}
+    for i, (_, keyword) in enumerate(patterns):
+        if keyword:
+            keyword_patterns.setdefault(keyword, []).append(i)
+
+    # The scanner consumes each hit, so a keyword starting inside another
+    # keyword's hit would never be reported on its own. Record every
+    # offset at which one keyword could start within another.
+    overlaps = {}
+    for keyword in keyword_patterns:
+        overlaps[keyword] = [
+            (offset, other)
+            for offset in range(len(keyword))
+            for other in keyword_patterns
+            if keyword[offset:].startswith(other) or other.startswith(keyword[offset:])
+        ]
 
-    return analysis
+    # Longest keywords first so shorter prefixes are still found via overlaps
+    alternation = '|'.join(re.escape(k) for k in sorted(keyword_patterns, key=len, reverse=True))
+    scanner = re.compile(alternation) if alternation else None
+    return patterns, targets, keyword_patterns, overlaps, scanner
+
+_REGISTRY = _build_pattern_registry(ANALYSIS_PATTERNS)
+
+def normalize_sections(sections):
+    """Return the requested ANALYSIS_PATTERNS section ids as a tuple in
+    report order, or None for all sections.
+
+    Raises ValueError for unknown section ids.
+    """
+    if sections is None:
+        return None
+    unknown = set(sections) - set(ANALYSIS_PATTERNS)
+    if unknown:
+        raise ValueError(f"Unknown sections: {', '.join(sorted(unknown))}. "
+                         f"Choose from: {', '.join(ANALYSIS_PATTERNS)}")
+    selected = tuple(section for section in ANALYSIS_PATTERNS if section in sections)
+    return None if len(selected) == len(ANALYSIS_PATTERNS) else selected
+
+@functools.lru_cache(maxsize=64)
+def _section_registry(sections):
+    """Return the pattern registry for a normalize_sections result."""
+    if sections is None:
+        return _REGISTRY
+    return _build_pattern_registry({section: ANALYSIS_PATTERNS[section] for section in sections})
+
+def _scan_patterns(text, registry=_REGISTRY):
+    """Run every pattern of registry over text, returning the (start, end)
+    spans of its matches per pattern.
+
+    Patterns with a leading keyword are only tried at positions where the
+    keyword occurs, found with a single scan of the text. The result for each
+    pattern is identical to re.finditer over the whole text.
+    """
+    patterns, _, keyword_patterns, overlaps, scanner = registry
+    found = [[] for _ in patterns]
+    resume_at = [0] * len(patterns)
+
+    hits = scanner.finditer(text) if scanner else ()
+    for hit in hits:
+        for offset, keyword in overlaps[hit.group(0)]:
+            pos = hit.start() + offset
+            if not text.startswith(keyword, pos):
+                continue
+            for i in keyword_patterns[keyword]:
+                # finditer never reports a match overlapping the previous one
+                if pos < resume_at[i]:
+                    continue
+                match = patterns[i][0].match(text, pos)
+                if match:
+                    found[i].append(match.span())
+                    resume_at[i] = match.end()
+
+    for i, (pattern, keyword) in enumerate(patterns):
+        if keyword is None:
+            found[i] = [match.span() for match in pattern.finditer(text)]
+
+    return found
+
+# Report titles of the ANALYSIS_PATTERNS sections. Category titles are
+# derived from their names.
+ANALYSIS_SECTION_TITLES = {
+    'policy_identification': 'Policy Identification',
+    'company_details': 'Company Details',
+    'coverage_details': 'Coverage Details',
+    'eligibility_criteria': 'Eligibility Criteria',
+    'key_benefits': 'Key Benefits',
+    'waiting_periods': 'Waiting Periods',
+    'key_exclusions': 'Key Exclusions',
+    'special_features': 'Special Features',
+    'claims_process': 'Claims Process',
+    'contact_info': 'Contact Information'
+}
+
+def _page_number(offset, page_starts):
+    """Return the 1-based page containing text offset, or None if the page
+    boundaries are unknown."""
+    return bisect.bisect_right(page_starts, offset) if page_starts else None
+
+def _make_span(text, start, end, page_starts):
+    return {"text": text[start:end], "start": start, "end": end,
+            "page": _page_number(start, page_starts)}
+
+def _group_span(match, group, page_starts):
+    """Return the span of a match group with surrounding whitespace removed."""
+    start, end = match.span(group)
+    value = match.group(group)
+    start += len(value) - len(value.lstrip())
+    end -= len(value) - len(value.rstrip())
+    return _make_span(match.string, start, end, page_starts)
+
+def _build_analysis(text, found, page_starts=None, sections=None):
+    """Build the analyze_text result from match spans per pattern of the
+    registry for sections."""
+    targets = _section_registry(sections)[1]
+    selected = sections or ANALYSIS_PATTERNS
+    sections = {}
+    for section in selected:
+        group = ANALYSIS_PATTERNS[section]
+        if isinstance(group, dict):
+            categories = {category: {"title": category.replace('_', ' ').title(), "matches": []}
+                          for category in group}
+            sections[section] = {"title": ANALYSIS_SECTION_TITLES[section], "categories": categories}
+        else:
+            sections[section] = {"title": ANALYSIS_SECTION_TITLES[section], "matches": []}
+
+    # Fan each pattern's matches out to every section and category that
+    # lists it
+    for section, category, i in targets:
+        target = sections[section] if category is None else sections[section]["categories"][category]
+        target["matches"].extend(_make_span(text, start, end, page_starts) for start, end in found[i])
+
+    return {
+        "generated_on": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "sections": sections
+    }
+
+def analyze_text(text, page_starts=None, sections=None):
+    """Analyze the text and return the structured analysis report.
+
+    sections lists the ANALYSIS_PATTERNS section ids to analyze; only their
+    patterns are run and only they appear in the report. By default every
+    section is analyzed.
+
+    The result maps each section id to its title and either "matches" or
+    "categories" (category id -> title and matches). Every match is a span
+    dict: its text, start and end offsets in text, and page number.
+    page_starts lists the offset at which each page starts in text; without
+    it, pages are None.
+    """
+    sections = normalize_sections(sections)
+    found = _scan_patterns(text, _section_registry(sections))
+    return _build_analysis(text, found, page_starts, sections)
+
+def analyze_pdf(pdf_source, page_cache, workers=None, backend=None, on_page=None, sections=None,
+                on_timing=None):
+    """Extract and analyze a PDF, re-analyzing only pages missing from page_cache.
+
+    Returns (text, page_starts, analysis): the text extract_text_from_pdf
+    would return, the offset of each page in it, and the analyze_text
+    report merged from per-page matches. Each page is scanned on its own,
+    so unlike analyze_text on the whole text, a match never runs across a
+    page break. Errors are raised rather than printed.
+
+    sections selects report sections as for analyze_text. Page matches are
+    cached per selection of sections.
+
+    on_timing is called as for iter_cached_pdf_pages, and once more with
+    ('analysis', seconds) for merging the report.
+    """
+    sections = normalize_sections(sections)
+    registry = _section_registry(sections)
+    namespace = 'enhanced' if sections is None else 'enhanced-' + '+'.join(sections)
+    scan_page = functools.partial(_scan_patterns, registry=registry)
+
+    pages = []
+    page_starts = []
+    offset = 0
+    found = [[] for _ in registry[0]]
+    for page_number, page_text, page_found in iter_cached_pdf_pages(
+            pdf_source, page_cache, scan_page, namespace, workers, backend, on_timing=on_timing):
+        if on_page:
+            on_page(page_number, page_text)
+        pages.append(page_text + "\n")
+        page_starts.append(offset)
+        for matches, page_matches in zip(found, page_found):
+            matches.extend((offset + start, offset + end) for start, end in page_matches)
+        offset += len(page_text) + 1
+    text = "".join(pages)
+    start = time.perf_counter()
+    analysis = _build_analysis(text, found, page_starts, sections)
+    if on_timing:
+        on_timing('analysis', time.perf_counter() - start)
+    return text, page_starts, analysis
+
+def render_analysis_report(analysis):
+    """Return the text report for an analyze_text result."""
+    sections = []
+    for number, section in enumerate(analysis["sections"].values(), start=1):
+        lines = [f"{number}. {section['title'].upper()}", "-" * 30]
+        if "categories" in section:
+            for category in section["categories"].values():
+                lines.append(f"\n{category['title']}:")
+                lines.extend(f"- {match['text']}" for match in category["matches"])
+        else:
+            lines.extend(f"- {match['text']}" for match in section["matches"])
+        sections.append("\n".join(lines) + "\n")
+
+    header = (
+        "POLICY DOCUMENT ANALYSIS REPORT\n"
+        + "=" * 50 + "\n\n"
+        + f"Generated on: {analysis['generated_on']}\n"
+        + "=" * 50 + "\n\n"
+    )
+    return header + "\n".join(sections)
 
 def save_analysis_report(analysis, output_file):
     """Save the analysis report to a file."""
     with open(output_file, 'w', encoding='utf-8') as f:
-        f.write("POLICY DOCUMENT ANALYSIS REPORT\n")
+        f.write(render_analysis_report(analysis))
+
+# Width of the rule under each summary section title
+_SUMMARY_RULE_WIDTHS = {
+    'policy_details': 15,
+    'coverage_details': 17,
+    'premium_information': 20,
+    'exclusions_limitations': 25,
+    'claims_process': 15,
+    'terms_conditions': 20,
+    'contact_information': 20
+}
+
+# Text written before each value of a list item in the text summary
+_SUMMARY_VALUE_PREFIXES = {
+    'sum_insured_options': 'Rs. '
+}
+
+SUMMARY_DISCLAIMER = ("IMPORTANT: This is a simplified summary. Please refer to the policy document "
+                      "for complete terms, conditions, and details.")
+
+def _fixed_span(text):
+    """Span for standard wording that is not taken from the document."""
+    return {"text": text, "start": None, "end": None, "page": None}
+
+def build_summary(text, page_starts=None):
+    """Return the structured policy document summary.
+
+    The result maps each section id to its title and items. An item has an
+    id, a label and either a single "value" or a list of "values"; values
+    are span dicts as in analyze_text, with no offsets or page for standard
+    wording that is not taken from the document.
+    """
+    def item(item_id, label, value):
+        return {"id": item_id, "label": label, "value": value}
+
+    def list_item(item_id, label, values):
+        return {"id": item_id, "label": label, "values": values}
+
+    def search(pattern):
+        match = re.search(pattern, text)
+        return _group_span(match, 1, page_starts) if match else None
+
+    def find(pattern, limit):
+        # Stop scanning once enough matches are found
+        matches = itertools.islice(re.finditer(pattern, text), limit)
+        return [_group_span(match, 1, page_starts) for match in matches]
+
+    sections = {}
+
+    # 1. Policy Details
+    items = [
+        item('policy_name', 'Policy Name', _fixed_span('Total Health Plan')),
+        item('policy_type', 'Policy Type', _fixed_span('Health Insurance'))
+    ]
+    # As in ANALYSIS_PATTERNS, only try the start of each run of letters
+    company_match = re.search(r'(?<![A-Za-z\s])([A-Za-z\s]+(?:Limited|Ltd\.?))\s*(?:IRDAI\s+Reg\.?\s+No\.?\s*:?\s*(\d+))?', text)
+    if company_match:
+        items.append(item('insurer', 'Insurer', _group_span(company_match, 1, page_starts)))
+        if company_match.group(2):
+            items.append(item('irdai_registration', 'IRDAI Registration', _group_span(company_match, 2, page_starts)))
+    cin = search(r'CIN\s*:?\s*([A-Z0-9]+)')
+    if cin:
+        items.append(item('cin', 'CIN', cin))
+    address = search(r'(?:Registered|Corporate)\s+(?:&\s+)?Office\s*:?\s*([^\.]+)')
+    if address:
+        items.append(item('registered_office', 'Registered Office', address))
+    sections['policy_details'] = {"title": "Policy Details", "items": items}
+
+    # 2. Coverage Details
+    items = [item('base_coverage', 'Base Coverage', _fixed_span('Hospitalization and Medical Expenses'))]
+    sum_insured = find(r'Sum\s+Insured\s++(?:(?:range|options|from)\s*+)?(?::\s*+)?Rs\.?\s*([^.]+)', 3)
+    if sum_insured:
+        items.append(list_item('sum_insured_options', 'Sum Insured Options', sum_insured))
+    # The benefit keyword is looked for once, in a bounded lookahead, rather
+    # than by backtracking through the sentence from every start
+    benefits = find(rf'(?:Benefits?|Coverage)\s+includes?\s*:?\s*((?=[^.]{{1,{MAX_SENTENCE_CHARS}}}?(?:hospitalization|treatment|medical|surgery|consultation)[^.])[^.]++)', 4)
+    if benefits:
+        items.append(list_item('key_benefits', 'Key Benefits', benefits))
+    sections['coverage_details'] = {"title": "Coverage Details", "items": items}
+
+    # 3. Premium Information
+    items = []
+    premium_details = find(r'Premium\s+(?:details?|information)\s*:?\s*([^.]+)', 2)
+    if premium_details:
+        items.append(list_item('premium_details', 'Premium Details', premium_details))
+    items.append(item('payment_options', 'Payment Options', _fixed_span('Annual, Half-yearly, Quarterly')))
+    grace = search(r'Grace\s+Period\s*:?\s*([^.]+)')
+    if grace:
+        items.append(item('grace_period', 'Grace Period', grace))
+    sections['premium_information'] = {"title": "Premium Information", "items": items}
+
+    # 4. Exclusions & Limitations
+    items = []
+    std_exclusions = find(r'(?:Standard|General)\s+Exclusions?\s*:?\s*([^.]+)', 3)
+    if std_exclusions:
+        items.append(list_item('standard_exclusions', 'Standard Exclusions', std_exclusions))
+    waiting_periods = find(r'(?:Waiting|Cooling)\s+Period\s*:?\s*([^.]+)', 3)
+    if waiting_periods:
+        items.append(list_item('waiting_periods', 'Waiting Periods', waiting_periods))
+    limits = find(r'(?:Limit|Cap|Maximum)\s+(?:for|on)\s+([^.]+)', 3)
+    if limits:
+        items.append(list_item('coverage_limits', 'Coverage Limits', limits))
+    sections['exclusions_limitations'] = {"title": "Exclusions & Limitations", "items": items}
+
+    # 5. Claims Process
+    items = [
+        list_item('cashless_claims', 'Cashless Claims Process', [
+            _fixed_span('Pre-authorization required from TPA/Insurer'),
+            _fixed_span('Available at network hospitals')
+        ]),
+        list_item('reimbursement_claims', 'Reimbursement Claims', [
+            _fixed_span('Submit all required documents within specified time'),
+            _fixed_span('Original bills and medical records required')
+        ])
+    ]
+    docs = find(r'(?:Required|Necessary)\s+documents?\s+(?:for|to)\s+([^.]+)', 3)
+    if docs:
+        items.append(list_item('required_documents', 'Required Documents', docs))
+    sections['claims_process'] = {"title": "Claims Process", "items": items}
+
+    # 6. Terms & Conditions
+    sections['terms_conditions'] = {"title": "Terms & Conditions", "items": [
+        list_item('renewal_terms', 'Renewal Terms', [
+            _fixed_span('Policy renewable lifelong'),
+            _fixed_span('Renewal premium may vary')
+        ]),
+        list_item('cancellation', 'Cancellation', [
+            _fixed_span('Free look period of 15 days'),
+            _fixed_span('Pro-rata refund on cancellation')
+        ])
+    ]}
+
+    # 7. Contact Information
+    items = []
+    toll_free = search(r'(?:Toll\s+Free|Helpline)\s*:?\s*([0-9\s-]+)')
+    if toll_free:
+        items.append(item('toll_free', 'Toll Free', toll_free))
+    email = search(r'Email\s*:?\s*([a-zA-Z0-9.@]+)')
+    if email:
+        items.append(item('email', 'Email', email))
+    website = search(r'(?:Website|Visit)\s*:?\s*(www\.[a-zA-Z0-9.-]+)')
+    if website:
+        items.append(item('website', 'Website', website))
+    sections['contact_information'] = {"title": "Contact Information", "items": items}
+
+    return {
+        "generated_on": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "sections": sections
+    }
+
+def render_summary(summary):
+    """Return the text summary for a build_summary result."""
+    with io.StringIO() as f:
+        f.write("POLICY DOCUMENT SUMMARY\n")
         f.write("=" * 50 + "\n\n")
-        f.write(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write(f"Generated on: {summary['generated_on']}\n")
         f.write("=" * 50 + "\n\n")
 
-        # Policy Identification
-        f.write("1. POLICY IDENTIFICATION\n")
-        f.write("-" * 30 + "\n")
-        for item in analysis['policy_identification']:
-            f.write(f"- {item}\n")
-        f.write("\n")
-
-        # Company Details
-        f.write("2. COMPANY DETAILS\n")
-        f.write("-" * 30 + "\n")
-        for item in analysis['company_details']:
-            f.write(f"- {item}\n")
-        f.write("\n")
-
-        # Coverage Details
-        f.write("3. COVERAGE DETAILS\n")
-        f.write("-" * 30 + "\n")
-        for item in analysis['coverage_details']:
-            f.write(f"- {item}\n")
-        f.write("\n")
-
-        # Eligibility Criteria
-        f.write("4. ELIGIBILITY CRITERIA\n")
-        f.write("-" * 30 + "\n")
-        for item in analysis['eligibility_criteria']:
-            f.write(f"- {item}\n")
-        f.write("\n")
-
-        # Key Benefits
-        f.write("5. KEY BENEFITS\n")
-        f.write("-" * 30 + "\n")
-        for category, items in analysis['key_benefits'].items():
-            f.write(f"\n{category.title()}:\n")
-            for item in items:
-                f.write(f"- {item}\n")
-        f.write("\n")
-
-        # Waiting Periods
-        f.write("6. WAITING PERIODS\n")
-        f.write("-" * 30 + "\n")
-        for item in analysis['waiting_periods']:
-            f.write(f"- {item}\n")
-        f.write("\n")
-
-        # Key Exclusions
-        f.write("7. KEY EXCLUSIONS\n")
-        f.write("-" * 30 + "\n")
-        for category, items in analysis['key_exclusions'].items():
-            f.write(f"\n{category.replace('_', ' ').title()}:\n")
-            for item in items:
-                f.write(f"- {item}\n")
-        f.write("\n")
-
-        # Special Features
-        f.write("8. SPECIAL FEATURES\n")
-        f.write("-" * 30 + "\n")
-        for category, items in analysis['special_features'].items():
-            f.write(f"\n{category.replace('_', ' ').title()}:\n")
-            for item in items:
-                f.write(f"- {item}\n")
-        f.write("\n")
-
-        # Claims Process
-        f.write("9. CLAIMS PROCESS\n")
-        f.write("-" * 30 + "\n")
-        for item in analysis['claims_process']:
-            f.write(f"- {item}\n")
-        f.write("\n")
-
-        # Contact Information
-        f.write("10. CONTACT INFORMATION\n")
-        f.write("-" * 30 + "\n")
-        for item in analysis['contact_info']:
-            f.write(f"- {item}\n")
+        for number, (section_id, section) in enumerate(summary["sections"].items(), start=1):
+            f.write(f"{number}. {section['title'].upper()}\n")
+            f.write("-" * _SUMMARY_RULE_WIDTHS.get(section_id, len(section['title'])) + "\n")
+            for entry in section["items"]:
+                if "value" in entry:
+                    f.write(f"- {entry['label']}: {entry['value']['text']}\n")
+                else:
+                    f.write(f"- {entry['label']}:\n")
+                    prefix = _SUMMARY_VALUE_PREFIXES.get(entry['id'], '')
+                    for value in entry["values"]:
+                        f.write(f"  * {prefix}{value['text']}\n")
+            f.write("\n")
+
+        f.write(SUMMARY_DISCLAIMER)
+        return f.getvalue()
+
+def render_simplified_text(text):
+    """Return a comprehensive but concise policy document summary."""
+    return render_summary(build_summary(text))
 
 def save_simplified_text(text, output_file):
     """Save a comprehensive but concise policy document summary."""
     with open(output_file, 'w', encoding='utf-8') as f:
-        f.write("POLICY DOCUMENT SUMMARY\n")
-        f.write("=" * 50 + "\n\n")
-        f.write(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write("=" * 50 + "\n\n")
-
-        # 1. Policy Details
-        f.write("1. POLICY DETAILS\n")
-        f.write("-" * 15 + "\n")
-        
-        # Policy Name and Type
-        f.write("- Policy Name: Total Health Plan\n")
-        f.write("- Policy Type: Health Insurance\n")
-        
-        # Insurer Details
-        company_match = re.search(r'([A-Za-z\s]+(?:Limited|Ltd\.?))\s*(?:IRDAI\s+Reg\.?\s+No\.?\s*:?\s*(\d+))?', text)
-        if company_match:
-            f.write(f"- Insurer: {company_match.group(1).strip()}\n")
-            if company_match.group(2):
-                f.write(f"- IRDAI Registration: {company_match.group(2)}\n")
-        
-        # CIN
-        cin_match = re.search(r'CIN\s*:?\s*([A-Z0-9]+)', text)
-        if cin_match:
-            f.write(f"- CIN: {cin_match.group(1)}\n")
-        
-        # Office Address
-        address_match = re.search(r'(?:Registered|Corporate)\s+(?:&\s+)?Office\s*:?\s*([^\.]+)', text)
-        if address_match:
-            f.write(f"- Registered Office: {address_match.group(1).strip()}\n")
-        f.write("\n")
-
-        # 2. Coverage Details
-        f.write("2. COVERAGE DETAILS\n")
-        f.write("-" * 17 + "\n")
-        
-        # Base Coverage
-        f.write("- Base Coverage: Hospitalization and Medical Expenses\n")
-        
-        # Sum Insured
-        sum_insured_matches = re.findall(r'Sum\s+Insured\s+(?:range|options|from)?\s*:?\s*Rs\.?\s*([^.]+)', text)
-        if sum_insured_matches:
-            f.write("- Sum Insured Options:\n")
-            for match in sum_insured_matches[:3]:
-                f.write(f"  * Rs. {match.strip()}\n")
-        
-        # Key Benefits
-        benefits = re.findall(r'(?:Benefits?|Coverage)\s+includes?\s*:?\s*([^.]+(?:hospitalization|treatment|medical|surgery|consultation)[^.]+)', text)
-        if benefits:
-            f.write("- Key Benefits:\n")
-            for benefit in benefits[:4]:
-                f.write(f"  * {benefit.strip()}\n")
-        f.write("\n")
-
-        # 3. Premium Information
-        f.write("3. PREMIUM INFORMATION\n")
-        f.write("-" * 20 + "\n")
-        
-        # Premium Details
-        premium_details = re.findall(r'Premium\s+(?:details?|information)\s*:?\s*([^.]+)', text)
-        if premium_details:
-            f.write("- Premium Details:\n")
-            for detail in premium_details[:2]:
-                f.write(f"  * {detail.strip()}\n")
-        
-        # Payment Options
-        f.write("- Payment Options: Annual, Half-yearly, Quarterly\n")
-        
-        # Grace Period
-        grace = re.search(r'Grace\s+Period\s*:?\s*([^.]+)', text)
-        if grace:
-            f.write(f"- Grace Period: {grace.group(1).strip()}\n")
-        f.write("\n")
-
-        # 4. Exclusions & Limitations
-        f.write("4. EXCLUSIONS & LIMITATIONS\n")
-        f.write("-" * 25 + "\n")
-        
-        # Standard Exclusions
-        std_exclusions = re.findall(r'(?:Standard|General)\s+Exclusions?\s*:?\s*([^.]+)', text)
-        if std_exclusions:
-            f.write("- Standard Exclusions:\n")
-            for excl in std_exclusions[:3]:
-                f.write(f"  * {excl.strip()}\n")
-        
-        # Waiting Periods
-        waiting_periods = re.findall(r'(?:Waiting|Cooling)\s+Period\s*:?\s*([^.]+)', text)
-        if waiting_periods:
-            f.write("- Waiting Periods:\n")
-            for period in waiting_periods[:3]:
-                f.write(f"  * {period.strip()}\n")
-        
-        # Coverage Limits
-        limits = re.findall(r'(?:Limit|Cap|Maximum)\s+(?:for|on)\s+([^.]+)', text)
-        if limits:
-            f.write("- Coverage Limits:\n")
-            for limit in limits[:3]:
-                f.write(f"  * {limit.strip()}\n")
-        f.write("\n")
-
-        # 5. Claims Process
-        f.write("5. CLAIMS PROCESS\n")
-        f.write("-" * 15 + "\n")
-        
-        # Cashless Claims
-        f.write("- Cashless Claims Process:\n")
-        f.write("  * Pre-authorization required from TPA/Insurer\n")
-        f.write("  * Available at network hospitals\n")
-        
-        # Reimbursement Claims
-        f.write("- Reimbursement Claims:\n")
-        f.write("  * Submit all required documents within specified time\n")
-        f.write("  * Original bills and medical records required\n")
-        
-        # Required Documents
-        docs = re.findall(r'(?:Required|Necessary)\s+documents?\s+(?:for|to)\s+([^.]+)', text)
-        if docs:
-            f.write("- Required Documents:\n")
-            for doc in docs[:3]:
-                f.write(f"  * {doc.strip()}\n")
-        f.write("\n")
-
-        # 6. Terms & Conditions
-        f.write("6. TERMS & CONDITIONS\n")
-        f.write("-" * 20 + "\n")
-        
-        # Renewal Terms
-        f.write("- Renewal Terms:\n")
-        f.write("  * Policy renewable lifelong\n")
-        f.write("  * Renewal premium may vary\n")
-        
-        # Cancellation
-        f.write("- Cancellation:\n")
-        f.write("  * Free look period of 15 days\n")
-        f.write("  * Pro-rata refund on cancellation\n")
-        f.write("\n")
-
-        # 7. Contact Information
-        f.write("7. CONTACT INFORMATION\n")
-        f.write("-" * 20 + "\n")
-        
-        # Toll Free
-        toll_free = re.search(r'(?:Toll\s+Free|Helpline)\s*:?\s*([0-9\s-]+)', text)
-        if toll_free:
-            f.write(f"- Toll Free: {toll_free.group(1).strip()}\n")
-        
-        # Email
-        email = re.search(r'Email\s*:?\s*([a-zA-Z0-9.@]+)', text)
-        if email:
-            f.write(f"- Email: {email.group(1)}\n")
-        
-        # Website
-        website = re.search(r'(?:Website|Visit)\s*:?\s*(www\.[a-zA-Z0-9.-]+)', text)
-        if website:
-            f.write(f"- Website: {website.group(1)}\n")
-        
-        f.write("\nIMPORTANT: This is a simplified summary. Please refer to the policy document for complete terms, conditions, and details.")
+        f.write(render_simplified_text(text))
 
 def main():
     """Main function to process PDF and generate reports."""
@@ -0,0 +1,112 @@
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class JobQueue:
+    """Bounded queue of background jobs processed by a pool of threads.
+
+    Jobs are kept in memory, so a job can only be looked up on the worker
+    process that accepted it. Finished jobs are retained up to max_finished
+    entries, oldest first out.
+    """
+
+    def __init__(self, handler, workers=2, max_queued=16, max_finished=1000):
+        self.handler = handler
+        self.workers = workers
+        self.max_finished = max_finished
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def _start_workers(self):
+        # Threads are started on first submit rather than at import so
+        # gunicorn's pre-fork master never owns them.
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, *args):
+        """Queue handler(*args) and return the new job id.
+
+        Raises QueueFullError when max_queued jobs are already waiting.
+        """
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None
+        }
+
+        with self._lock:
+            self._start_workers()
+            try:
+                self._queue.put_nowait((job_id, args))
+            except queue.Full:
+                raise QueueFullError("Job queue is full")
+            self._jobs[job_id] = job
+        return job_id
+
+    def get(self, job_id):
+        """Return a copy of the job record, or None if it is unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def stats(self):
+        """Return queue depth and job counts by status."""
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return {
+                "workers": self.workers,
+                "queued": self._queue.qsize(),
+                "max_queued": self._queue.maxsize,
+                "jobs": counts
+            }
+
+    def _work(self):
+        while True:
+            job_id, args = self._queue.get()
+            with self._lock:
+                job = self._jobs[job_id]
+                job["status"] = "running"
+                job["started_at"] = time.time()
+
+            try:
+                result = self.handler(*args)
+                update = {"status": "done", "result": result}
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {str(e)}")
+                update = {"status": "failed", "error": str(e)}
+
+            with self._lock:
+                job.update(update)
+                job["finished_at"] = time.time()
+                self._forget_old_jobs()
+
+            self._queue.task_done()
+
+    def _forget_old_jobs(self):
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if job["status"] in ("done", "failed")]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
@@ -0,0 +1,177 @@
+import hashlib
+import importlib.util
+import io
+import logging
+import os
+import re
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# Backend used when none is requested explicitly: "pymupdf" or "pypdf2"
+DEFAULT_BACKEND = os.environ.get('PDF_BACKEND', 'pymupdf')
+
+# Backends read a PDF "source": either a file path or the document's bytes,
+# so uploads held in memory never have to be written to disk first.
+
+
+class PyMuPDFBackend:
+    """Fast text extraction using PyMuPDF (MuPDF's C parser)."""
+
+    name = 'pymupdf'
+
+    @staticmethod
+    def available():
+        return importlib.util.find_spec('fitz') is not None
+
+    def _open(self, pdf_source):
+        import fitz
+        if isinstance(pdf_source, (bytes, bytearray)):
+            return fitz.open(stream=pdf_source, filetype='pdf')
+        return fitz.open(pdf_source)
+
+    def page_count(self, pdf_source):
+        with self._open(pdf_source) as doc:
+            return doc.page_count
+
+    def iter_pages(self, pdf_source, start=0, stop=None):
+        """Yield the raw text of pages [start, stop)."""
+        with self._open(pdf_source) as doc:
+            stop = doc.page_count if stop is None else stop
+            for i in range(start, stop):
+                yield doc.load_page(i).get_text()
+
+    def iter_selected_pages(self, pdf_source, indexes):
+        """Yield the raw text of the pages at indexes, in the given order."""
+        with self._open(pdf_source) as doc:
+            for i in indexes:
+                yield doc.load_page(i).get_text()
+
+    def page_digests(self, pdf_source):
+        """Return a digest of each page's drawing instructions, without
+        extracting any text (see _page_digest)."""
+        with self._open(pdf_source) as doc:
+            digests = []
+            for page in doc:
+                forms = [doc.xref_stream_raw(xobject[0]) for xobject in page.get_xobjects()]
+                fonts = [font[3] for font in page.get_fonts()]
+                digests.append(_page_digest(page.read_contents(), forms, fonts))
+            return digests
+
+
+class PyPDF2Backend:
+    """Pure-Python text extraction using PyPDF2."""
+
+    name = 'pypdf2'
+
+    @staticmethod
+    def available():
+        return importlib.util.find_spec('PyPDF2') is not None
+
+    def _open(self, pdf_source):
+        if isinstance(pdf_source, (bytes, bytearray)):
+            return io.BytesIO(pdf_source)
+        return open(pdf_source, 'rb')
+
+    def page_count(self, pdf_source):
+        import PyPDF2
+        with self._open(pdf_source) as file:
+            return len(PyPDF2.PdfReader(file).pages)
+
+    def iter_pages(self, pdf_source, start=0, stop=None):
+        """Yield the raw text of pages [start, stop)."""
+        import PyPDF2
+        with self._open(pdf_source) as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            stop = len(pdf_reader.pages) if stop is None else stop
+            for i in range(start, stop):
+                yield pdf_reader.pages[i].extract_text()
+
+    def iter_selected_pages(self, pdf_source, indexes):
+        """Yield the raw text of the pages at indexes, in the given order."""
+        import PyPDF2
+        with self._open(pdf_source) as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            for i in indexes:
+                yield pdf_reader.pages[i].extract_text()
+
+    def page_digests(self, pdf_source):
+        """Return a digest of each page's drawing instructions, without
+        extracting any text (see _page_digest)."""
+        import PyPDF2
+        with self._open(pdf_source) as file:
+            digests = []
+            for page in PyPDF2.PdfReader(file).pages:
+                # /Contents is a single stream or an array of streams
+                contents = page.get('/Contents')
+                contents = contents.get_object() if contents is not None else []
+                if not isinstance(contents, list):
+                    contents = [contents]
+                data = b''.join(stream.get_object().get_data() for stream in contents)
+                resources = page.get('/Resources')
+                resources = resources.get_object() if resources is not None else {}
+                xobjects = resources.get('/XObject')
+                xobjects = xobjects.get_object() if xobjects is not None else {}
+                fonts = resources.get('/Font')
+                fonts = fonts.get_object() if fonts is not None else {}
+                forms = [xobject.get_object().get_data() for xobject in xobjects.values()
+                         if xobject.get_object().get('/Subtype') == '/Form']
+                font_names = [str(font.get_object().get('/BaseFont')) for font in fonts.values()]
+                digests.append(_page_digest(data, forms, font_names))
+            return digests
+
+
+def _page_digest(contents, forms, fonts):
+    """Hash a page's content stream together with the form XObjects it
+    draws and the names of its fonts.
+
+    Generators often draw shared headers and footers from a form XObject
+    and re-subset fonts on every export, so the content stream alone could
+    match a page whose text has changed.
+    """
+    digest = hashlib.sha256(contents)
+    for form in forms:
+        digest.update(b'\0form\0')
+        digest.update(form)
+    for font in fonts:
+        digest.update(b'\0font\0')
+        digest.update(font.encode('utf-8', 'replace'))
+    return digest.hexdigest()
+
+
+BACKENDS = {
+    PyMuPDFBackend.name: PyMuPDFBackend,
+    PyPDF2Backend.name: PyPDF2Backend
+}
+
+
+def get_backend(name=None):
+    """Return an extraction backend by name, falling back to PyPDF2.
+
+    name defaults to the PDF_BACKEND environment variable. If the requested
+    backend's library is not installed, PyPDF2 is used instead.
+    """
+    name = (name or DEFAULT_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown PDF backend: {name}. Choose from: {', '.join(BACKENDS)}")
+
+    backend_class = BACKENDS[name]
+    if not backend_class.available():
+        logger.warning(f"PDF backend {name} is not installed, falling back to {PyPDF2Backend.name}")
+        backend_class = PyPDF2Backend
+    return backend_class()
+
+
+def normalize_page_text(text):
+    """Normalise extracted page text so every backend feeds the same input
+    to the analysis regexes.
+
+    Applies NFKC (ligatures, non-breaking and full-width characters), drops
+    soft hyphens, unifies line endings and strips trailing whitespace from
+    each line and from the page.
+    """
+    text = unicodedata.normalize('NFKC', text or '')
+    text = text.replace('\xad', '')
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    text = re.sub(r'[ \t]+\n', '\n', text)
+    return text.rstrip()
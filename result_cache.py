@@ -0,0 +1,158 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def hash_bytes(data):
+    """Return the SHA-256 hex digest of in-memory document bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(file_path, chunk_size=64 * 1024):
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Two-tier cache of processing results keyed by document content hash.
+
+    The memory tier is a bounded LRU shared by the threads of one worker.
+    The optional disk tier stores one JSON file per key so results survive
+    worker restarts and are shared between gunicorn workers. With
+    max_disk_age (seconds), files not read or written for that long are
+    removed by a sweep of the directory run at most every tenth of that
+    age; without it the disk tier grows without limit.
+    """
+
+    def __init__(self, max_entries=128, cache_dir=None, max_disk_age=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_age = max_disk_age
+        self._next_sweep = 0.0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return self._entries[key]
+
+        if self.cache_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    value = json.load(f)
+            except (OSError, ValueError):
+                value = None
+            if value is not None:
+                if self.max_disk_age:
+                    # A hit keeps the file from being swept as old
+                    try:
+                        os.utime(path)
+                    except OSError:
+                        pass
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember(key, value)
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value):
+        """Store value in the memory tier and, if enabled, on disk."""
+        with self._lock:
+            self._remember(key, value)
+
+        if self.cache_dir:
+            # Write to a temporary file first so concurrent readers never
+            # see a partially written entry.
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(value, f)
+                os.replace(tmp_path, self._disk_path(key))
+            except OSError as e:
+                # The memory tier still holds the value; a failed disk write
+                # must not fail the request that produced it.
+                logger.warning(f"Could not write cache entry {key}: {str(e)}")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            self._maybe_sweep()
+
+    def _maybe_sweep(self):
+        if not self.max_disk_age:
+            return
+        now = time.time()
+        with self._lock:
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + self.max_disk_age / 10
+        self.sweep_disk(now - self.max_disk_age)
+
+    def sweep_disk(self, older_than):
+        """Remove disk entries (and abandoned temporary files) last used
+        before older_than, a time.time() value. Returns how many were
+        removed."""
+        removed = 0
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith(('.json', '.tmp')):
+                    continue
+                try:
+                    if entry.stat().st_mtime < older_than:
+                        os.remove(entry.path)
+                        removed += 1
+                except OSError:
+                    # Already removed, e.g. by another worker's sweep
+                    pass
+        if removed:
+            logger.info(f"Removed {removed} cache entries older than {self.max_disk_age}s from {self.cache_dir}")
+        return removed
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "disk_enabled": bool(self.cache_dir),
+                "max_disk_age": self.max_disk_age,
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": hits / lookups if lookups else 0.0
+            }
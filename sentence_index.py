@@ -0,0 +1,86 @@
+import bisect
+import itertools
+import re
+
+
+class SentenceIndex:
+    """Sentences of a document and an inverted index of keywords to the
+    sentences containing them.
+
+    A sentence runs up to and including the next period, so every match of
+    a pattern that cannot contain a period (other than as its last
+    character) lies within one sentence. Such patterns only need to be run
+    on the sentences containing their keywords: run them on the span of
+    each of the candidates for their keywords.
+
+    The text is split into sentences once. Each keyword word is looked up on
+    first use with one scan of the text and remembered, so patterns sharing
+    a keyword never scan for it again.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        # Keywords are ASCII, so they are looked up in an ASCII-lowercased
+        # copy of the text of the same length: every other character becomes
+        # "?", and offsets stay valid for the original text
+        self._folded = text.encode('ascii', 'replace').lower()
+        # A sentence starts after each period: the running sum of the
+        # lengths of the period-separated parts, one period each
+        parts = self._folded.split(b'.')
+        self.starts = [0]
+        self.starts.extend(itertools.accumulate(map((1).__add__, map(len, parts[:-1]))))
+        if len(self.starts) > 1 and self.starts[-1] == len(text):
+            self.starts.pop()
+        self._word_ids = {}
+
+    def span(self, sentence_id):
+        """Return the (start, end) offsets of a sentence, period included."""
+        end = self.starts[sentence_id + 1] if sentence_id + 1 < len(self.starts) else len(self.text)
+        return self.starts[sentence_id], end
+
+    def _sentences_with_word(self, word):
+        ids = self._word_ids.get(word)
+        if ids is None:
+            # Each hit runs on to the end of its sentence, so a sentence is
+            # only reported once however often it repeats the word
+            pattern = re.escape(word.lower().encode('ascii')) + rb'[^.]*+'
+            starts = self.starts
+            ids = self._word_ids[word] = {
+                bisect.bisect_right(starts, match.start()) - 1
+                for match in re.finditer(pattern, self._folded)
+            }
+        return ids
+
+    def sentences_with(self, keyword):
+        """Return the set of ids of the sentences that may contain keyword.
+
+        Keywords are matched case-insensitively and inside words ("claim" in
+        "disclaimer"). For a keyword of several words, these are the
+        sentences containing all of them, adjacent or not; only the longest
+        is looked up in the index.
+        """
+        words = keyword.split()
+        ids = self._sentences_with_word(max(words, key=len))
+        if len(words) == 1:
+            return ids
+        return {i for i in ids if self._sentence_has(i, keyword)}
+
+    def _sentence_has(self, sentence_id, keyword):
+        start, end = self.span(sentence_id)
+        sentence = self._folded[start:end]
+        return all(word.lower().encode('ascii') in sentence for word in keyword.split())
+
+    def candidates(self, keyword_groups):
+        """Return the ids, in text order, of the sentences containing a
+        keyword of every group.
+
+        Only the first group is looked up in the index; the sentences found
+        are then checked for the other groups directly, so it should be
+        the most selective one.
+        """
+        if not keyword_groups:
+            return range(len(self.starts))
+        ids = set().union(*(self.sentences_with(keyword) for keyword in keyword_groups[0]))
+        for group in keyword_groups[1:]:
+            ids = {i for i in ids if any(self._sentence_has(i, keyword) for keyword in group)}
+        return sorted(ids)
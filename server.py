@@ -1,7 +1,94 @@
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import email.utils
+import gzip
+import mimetypes
 import os
+import tempfile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content types worth serving compressed; charts and reports are large HTML
+# and text files, while images and PDFs are already compressed
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+# Precompressed variants, in order of preference: (Content-Encoding, suffix)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Directory whose files get precompressed variants, written at startup and
+# rewritten on demand when a file (e.g. a regenerated chart) changes
+PRECOMPRESS_DIR = 'static'
+
+
+def _is_compressible(path):
+    content_type, encoding = mimetypes.guess_type(path)
+    return encoding is None and (content_type or '').startswith(COMPRESSIBLE_TYPES)
+
+
+def _is_fresh(variant_path, source_stat):
+    """Return whether a precompressed variant exists and is not older than
+    its source."""
+    try:
+        return os.stat(variant_path).st_mtime_ns >= source_stat.st_mtime_ns
+    except OSError:
+        return False
+
+
+def _available_encodings():
+    return [(encoding, suffix) for encoding, suffix in ENCODINGS if encoding != 'br' or brotli is not None]
+
+
+def _write_variant(path, encoding, suffix):
+    """Compress a file into its variant, replacing it atomically so
+    concurrent requests never see a partial one."""
+    with open(path, 'rb') as source:
+        data = source.read()
+    data = brotli.compress(data) if encoding == 'br' else gzip.compress(data, compresslevel=9)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as target:
+            target.write(data)
+        os.replace(tmp_path, path + suffix)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def precompress(directory):
+    """Write .gz (and, when the brotli module is installed, .br) variants of
+    the compressible files under directory that lack an up-to-date one.
+
+    Returns the number of variants written.
+    """
+    written = 0
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            if name.endswith(('.gz', '.br')) or not _is_compressible(path):
+                continue
+            source_stat = os.stat(path)
+            for encoding, suffix in _available_encodings():
+                if not _is_fresh(path + suffix, source_stat):
+                    _write_variant(path, encoding, suffix)
+                    written += 1
+    return written
+
 
 class CORSRequestHandler(SimpleHTTPRequestHandler):
+    """Static file handler allowing cross-origin requests.
+
+    Files are sent with ETag and Last-Modified validators, and conditional
+    GETs that match get 304 Not Modified. Clients accepting brotli or gzip
+    get a precompressed variant (see precompress) when one is up to date.
+    Bodies are copied to the socket with sendfile.
+    """
+
+    # Keep-alive, so a page and its charts share one connection
+    protocol_version = 'HTTP/1.1'
+
     def end_headers(self):
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
@@ -10,13 +97,127 @@ class CORSRequestHandler(SimpleHTTPRequestHandler):
 
     def do_OPTIONS(self):
         self.send_response(200)
+        self.send_header('Content-Length', '0')
         self.end_headers()
 
-def run(server_class=HTTPServer, handler_class=CORSRequestHandler, port=8000):
+    def _accepted_encodings(self):
+        """Return the content codings the client accepts (q above 0)."""
+        accepted = set()
+        for value in self.headers.get('Accept-Encoding', '').split(','):
+            coding, *params = value.split(';')
+            quality = 1.0
+            for param in params:
+                name, _, number = param.strip().partition('=')
+                if name.strip().lower() == 'q':
+                    try:
+                        quality = float(number)
+                    except ValueError:
+                        quality = 0.0
+            if quality > 0:
+                accepted.add(coding.strip().lower())
+        return accepted
+
+    def _select_variant(self, path, source_stat):
+        """Return (path, Content-Encoding or None) of the representation of
+        a file to send."""
+        if not _is_compressible(path):
+            return path, None
+        accepted = self._accepted_encodings()
+        precompress_dir = os.path.join(os.path.abspath(self.directory), PRECOMPRESS_DIR)
+        in_precompress_dir = os.path.abspath(path).startswith(precompress_dir + os.sep)
+        for encoding, suffix in _available_encodings():
+            if encoding not in accepted:
+                continue
+            if not _is_fresh(path + suffix, source_stat) and in_precompress_dir:
+                try:
+                    _write_variant(path, encoding, suffix)
+                except OSError as e:
+                    self.log_error("Could not compress %s: %s", path, e)
+            if _is_fresh(path + suffix, source_stat):
+                return path + suffix, encoding
+        return path, None
+
+    def _not_modified(self, etag, mtime):
+        """Return whether the request's validators match the file."""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            # If-None-Match takes precedence over If-Modified-Since
+            tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+            return '*' in tags or etag in tags
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since is not None:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+            return since is not None and int(mtime) <= since.timestamp()
+        return False
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) or path.endswith('/') or not os.path.isfile(path):
+            # Directory listings, redirects and errors as before
+            return SimpleHTTPRequestHandler.send_head(self)
+
+        source_stat = os.stat(path)
+        variant_path, encoding = self._select_variant(path, source_stat)
+        try:
+            f = open(variant_path, 'rb')
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        try:
+            size = os.fstat(f.fileno()).st_size
+            # Validators come from the source file; each encoding is its own
+            # representation and so gets its own tag
+            etag = f'"{source_stat.st_mtime_ns:x}-{source_stat.st_size:x}{"-" + encoding if encoding else ""}"'
+            last_modified = self.date_time_string(source_stat.st_mtime)
+
+            if self._not_modified(etag, source_stat.st_mtime):
+                f.close()
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', last_modified)
+                self.send_header('Vary', 'Accept-Encoding')
+                self.end_headers()
+                return None
+
+            self.send_response(HTTPStatus.OK)
+            self.send_header('Content-Type', self.guess_type(path))
+            self.send_header('Content-Length', str(size))
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', last_modified)
+            # Cached, but revalidated on every use: charts are regenerated
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            return f
+        except Exception:
+            f.close()
+            raise
+
+    def copyfile(self, source, outputfile):
+        """Copy a file to the client with sendfile, without passing its
+        contents through Python."""
+        if outputfile is self.wfile:
+            # Falls back to plain sends for in-memory bodies (directory
+            # listings) and where os.sendfile is unavailable
+            self.connection.sendfile(source)
+        else:
+            SimpleHTTPRequestHandler.copyfile(self, source, outputfile)
+
+
+def run(server_class=ThreadingHTTPServer, handler_class=CORSRequestHandler, port=8000):
+    written = precompress(PRECOMPRESS_DIR) if os.path.isdir(PRECOMPRESS_DIR) else 0
+    if written:
+        print(f"Precompressed {written} static file variant(s)")
     server_address = ('', port)
     httpd = server_class(server_address, handler_class)
     print(f"Starting server on port {port}...")
     httpd.serve_forever()
 
 if __name__ == '__main__':
-    run() 
\ No newline at end of file
+    run()
@@ -1,51 +1,129 @@
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import pandas as pd
-import numpy as np
+import hashlib
+import json
+import logging
+import os
 import re
 from pathlib import Path
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from amounts import find_amounts
+
+logger = logging.getLogger(__name__)
+
+# plotly, pandas and numpy are imported inside the chart functions so that
+# importing this module stays cheap (amounts imports numpy lazily too).
+
+# Bump whenever a chart's figure code changes so charts written by an older
+# version are regenerated even though their data is unchanged.
+CHART_VERSION = "2"
+
+# Processes rendering charts in parallel; 1 renders them in this process
+CHART_WORKERS = int(os.environ.get('CHART_WORKERS', min(4, os.cpu_count() or 1)))
+
+STATIC_DIR = 'static'
 
 def extract_numbers(text):
-    """Extract numerical values from text."""
-    # Improved regex to better match Indian currency format
-    matches = re.findall(r'Rs\.?\s*([\d,]+(?:\.\d{2})?)|(\d+(?:,\d{3})*(?:\.\d{2})?)', text)
-    numbers = []
-    for match in matches:
-        # Take the non-empty group from the match
-        num_str = match[0] if match[0] else match[1]
-        # Remove commas and convert to float
-        try:
-            num = float(num_str.replace(',', ''))
-            if num > 0:  # Only include positive numbers
-                numbers.append(num)
-        except ValueError:
-            continue
-    return sorted(numbers, reverse=True)  # Sort in descending order
-
-def clean_text(text):
-    """Clean and preprocess text."""
-    # Remove special characters and normalize whitespace
-    text = re.sub(r'[^\w\s\.]', ' ', text)
-    text = re.sub(r'\s+', ' ', text)
-    return text.strip()
-
-def count_keywords(text, keywords):
-    """Count occurrences of keywords in text with improved accuracy."""
-    text = clean_text(text.lower())
-    counts = {}
-    for keyword in keywords:
-        # Use word boundaries to ensure we're matching whole words
-        pattern = r'\b' + re.escape(keyword.lower()) + r'\b'
-        counts[keyword] = len(re.findall(pattern, text))
-    return counts
+    """Extract the rupee amounts in text, largest first (see
+    amounts.find_amounts)."""
+    values = find_amounts(text).values
+    return sorted(values[values > 0].tolist(), reverse=True)
+
+class TokenStream:
+    """Lowercased word tokens of a text and their offsets.
+
+    The text is tokenized once and every chart counts from the same tokens:
+    keyword counts and word frequencies come from one Counter, and counts
+    per document section from one bincount over the tokens' vocabulary ids,
+    instead of a regex search per keyword per section.
+    """
+
+    def __init__(self, text):
+        self._text = text.lower()
+        self.tokens = re.findall(r'\w+', self._text)
+        self._starts = None
+        self._counts = None
+        self._vocabulary = None
+        self._ids = None
+
+    def __len__(self):
+        return len(self.tokens)
+
+    @property
+    def starts(self):
+        """Offsets of the tokens in the lowercased text, found on first use."""
+        if self._starts is None:
+            self._starts = [match.start() for match in re.finditer(r'\w+', self._text)]
+        return self._starts
+
+    def counts(self):
+        """Return a Counter of the tokens."""
+        if self._counts is None:
+            self._counts = Counter(self.tokens)
+        return self._counts
+
+    def _vocabulary_ids(self):
+        if self._ids is None:
+            import numpy as np
+
+            vocabulary = {}
+            self._ids = np.array([vocabulary.setdefault(token, len(vocabulary)) for token in self.tokens],
+                                 dtype=np.int64)
+            self._vocabulary = vocabulary
+        return self._vocabulary, self._ids
+
+    def count(self, keyword):
+        """Return how often keyword, one or more whole words, occurs."""
+        words = re.findall(r'\w+', keyword.lower())
+        if len(words) == 1:
+            return self.counts()[words[0]]
+        if not words or len(words) > len(self.tokens):
+            return 0
+        vocabulary, ids = self._vocabulary_ids()
+        if any(word not in vocabulary for word in words):
+            return 0
+        n = len(ids) - len(words) + 1
+        found = ids[:n] == vocabulary[words[0]]
+        for offset, word in enumerate(words[1:], 1):
+            found &= ids[offset:offset + n] == vocabulary[word]
+        return int(found.sum())
+
+    def section_counts(self, keywords, tokens_per_section):
+        """Return a (sections, keywords) NumPy array counting each
+        single-word keyword in consecutive runs of tokens_per_section
+        tokens."""
+        import numpy as np
+
+        vocabulary, ids = self._vocabulary_ids()
+        sections = -(-len(ids) // tokens_per_section)
+        # Column of each vocabulary word in the result, -1 if not a keyword
+        columns = np.full(len(vocabulary), -1, dtype=np.int64)
+        for column, keyword in enumerate(keywords):
+            if keyword in vocabulary:
+                columns[vocabulary[keyword]] = column
+        token_columns = columns[ids]
+        hits = np.flatnonzero(token_columns >= 0)
+        cells = hits // tokens_per_section * len(keywords) + token_columns[hits]
+        counts = np.bincount(cells, minlength=sections * len(keywords))
+        return counts.reshape(sections, len(keywords))
+
+def count_keywords(text, keywords, tokens=None):
+    """Count whole-word occurrences of keywords in text. tokens is the
+    text's TokenStream, if one has already been built."""
+    if tokens is None:
+        tokens = TokenStream(text)
+    return {keyword: tokens.count(keyword) for keyword in keywords}
+
+def build_coverage_figure(numbers):
+    """Build an interactive chart for coverage amounts, or return None when
+    there are none."""
+    import pandas as pd
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
 
-def create_coverage_chart(numbers):
-    """Create an interactive chart for coverage amounts."""
     if not numbers:
-        print("No valid numbers found for coverage chart")
-        return
+        logger.info("No valid numbers found for coverage chart")
+        return None
     
     # Take top 5 numbers for better visualization
     top_numbers = numbers[:5]
@@ -123,10 +201,16 @@ def create_coverage_chart(numbers):
         tickformat='.1f'
     )
     
-    fig.write_html('static/coverage_chart.html', include_plotlyjs='cdn')
+    return fig
+
+def create_coverage_chart(numbers):
+    """Create an interactive chart for coverage amounts."""
+    _write_chart('coverage', numbers[:5])
+
+def build_benefits_figure(keywords_count):
+    """Build an interactive treemap for benefits and requirements."""
+    import plotly.graph_objects as go
 
-def create_benefits_chart(keywords_count):
-    """Create an interactive treemap for benefits and requirements."""
     # Enhanced categorization
     categories = {
         'Benefits & Coverage': {
@@ -207,32 +291,33 @@ def create_benefits_chart(keywords_count):
         height=600
     )
     
-    fig.write_html('static/benefits_chart.html', include_plotlyjs='cdn')
+    return fig
 
-def create_keyword_trends(text):
-    """Create an interactive area chart showing keyword trends."""
-    # Clean and split text into more meaningful sections
-    cleaned_text = clean_text(text)
+def create_benefits_chart(keywords_count):
+    """Create an interactive treemap for benefits and requirements."""
+    _write_chart('benefits', keywords_count)
+
+def keyword_trend_counts(tokens):
+    """Return {keyword: [count in each section]} for the keyword trends
+    chart, over about ten equal runs of a TokenStream."""
     # Split into sections of roughly equal length
-    total_words = len(cleaned_text.split())
-    words_per_section = max(100, total_words // 10)  # Aim for 10 sections
-    
-    sections = []
-    words = cleaned_text.split()
-    for i in range(0, len(words), words_per_section):
-        section = ' '.join(words[i:i + words_per_section])
-        sections.append(section)
+    words_per_section = max(100, len(tokens) // 10)  # Aim for 10 sections
     
     keywords = ['benefit', 'cover', 'limit', 'exclude', 'require', 'premium', 'insure']
     
     # Count keywords in each section
-    section_counts = []
-    for i, section in enumerate(sections):
-        counts = {k: len(re.findall(r'\b' + k + r'\b', section.lower())) for k in keywords}
-        counts['section'] = i + 1
-        section_counts.append(counts)
-    
-    df = pd.DataFrame(section_counts)
+    counts = tokens.section_counts(keywords, words_per_section)
+    return {keyword: counts[:, i].tolist() for i, keyword in enumerate(keywords)}
+
+def build_keyword_trends_figure(trend_counts):
+    """Build an interactive area chart showing keyword trends."""
+    import pandas as pd
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    keywords = list(trend_counts)
+    df = pd.DataFrame(trend_counts, columns=keywords)
+    df['section'] = range(1, len(df) + 1)
     
     # Create figure
     fig = go.Figure()
@@ -285,13 +370,18 @@ def create_keyword_trends(text):
         )
     )
     
-    fig.write_html('static/keyword_trends.html', include_plotlyjs='cdn')
+    return fig
 
-def create_word_cloud(text):
-    """Create an interactive word cloud visualization."""
-    # Clean and tokenize text
-    cleaned_text = clean_text(text)
-    words = re.findall(r'\b\w+\b', cleaned_text.lower())
+def create_keyword_trends(text, tokens=None):
+    """Create an interactive area chart showing keyword trends."""
+    if tokens is None:
+        tokens = TokenStream(text)
+    _write_chart('keyword_trends', keyword_trend_counts(tokens))
+
+def word_frequencies(tokens, limit=50):
+    """Return the [word, frequency] pairs of the word cloud: the limit most
+    frequent words of a TokenStream appearing more than once, most frequent
+    first."""
     
     # Enhanced stop words
     stop_words = {
@@ -300,24 +390,32 @@ def create_word_cloud(text):
     }
     
     # Count word frequencies
-    word_freq = Counter(words)
     word_freq = {
-        word: freq for word, freq in word_freq.items() 
+        word: freq for word, freq in tokens.counts().items() 
         if word not in stop_words and len(word) > 2 and freq > 1  # Only include words that appear more than once
     }
-    
+    top_words = sorted(word_freq.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return [list(item) for item in top_words]
+
+def build_word_cloud_figure(frequencies):
+    """Build an interactive word cloud visualization."""
+    import numpy as np
+    import pandas as pd
+    import plotly.graph_objects as go
+
     # Create scatter plot that looks like a word cloud
-    words_df = pd.DataFrame(list(word_freq.items()), columns=['word', 'frequency'])
-    words_df = words_df.nlargest(50, 'frequency')
+    words_df = pd.DataFrame(frequencies, columns=['word', 'frequency'])
     
-    # Generate positions for words
-    np.random.seed(42)
-    words_df['x'] = np.random.randn(len(words_df))
-    words_df['y'] = np.random.randn(len(words_df))
+    # Generate positions for words from a generator of its own, so charts
+    # built concurrently neither race on nor reseed numpy's global state
+    rng = np.random.default_rng(42)
+    words_df['x'] = rng.standard_normal(len(words_df))
+    words_df['y'] = rng.standard_normal(len(words_df))
     
     # Create color scale based on frequency
     max_freq = words_df['frequency'].max()
     min_freq = words_df['frequency'].min()
+    freq_range = (max_freq - min_freq) or 1
     
     fig = go.Figure()
     
@@ -327,8 +425,8 @@ def create_word_cloud(text):
         mode='text',
         text=words_df['word'],
         textfont=dict(
-            size=[20 + (freq - min_freq) / (max_freq - min_freq) * 40 for freq in words_df['frequency']],
-            color=[f'rgba({np.random.randint(0,255)},{np.random.randint(0,255)},{np.random.randint(0,255)},0.8)' 
+            size=[20 + (freq - min_freq) / freq_range * 40 for freq in words_df['frequency']],
+            color=[f'rgba({rng.integers(0,255)},{rng.integers(0,255)},{rng.integers(0,255)},0.8)' 
                   for _ in range(len(words_df))]
         ),
         hovertemplate="<b>%{text}</b><br>" +
@@ -352,13 +450,133 @@ def create_word_cloud(text):
         plot_bgcolor='white'
     )
     
-    fig.write_html('static/word_cloud.html', include_plotlyjs='cdn')
+    return fig
+
+def create_word_cloud(text, tokens=None):
+    """Create an interactive word cloud visualization."""
+    if tokens is None:
+        tokens = TokenStream(text)
+    _write_chart('word_cloud', word_frequencies(tokens))
+
+# Each chart's output file in STATIC_DIR and the function building its
+# figure from the chart's data
+CHARTS = {
+    'coverage': ('coverage_chart.html', build_coverage_figure),
+    'benefits': ('benefits_chart.html', build_benefits_figure),
+    'keyword_trends': ('keyword_trends.html', build_keyword_trends_figure),
+    'word_cloud': ('word_cloud.html', build_word_cloud_figure)
+}
+
+def chart_fingerprint(name, data):
+    """Return the fingerprint of the data a chart is built from."""
+    payload = json.dumps([CHART_VERSION, name, data], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _chart_paths(name):
+    """Return the paths of a chart's file and of its fingerprint sidecar."""
+    path = os.path.join(STATIC_DIR, CHARTS[name][0])
+    return path, path + '.sha256'
+
+def chart_is_current(name, fingerprint):
+    """Return whether a chart was last written from data with fingerprint."""
+    path, fingerprint_path = _chart_paths(name)
+    try:
+        with open(fingerprint_path, 'r', encoding='utf-8') as f:
+            return f.read().strip() == fingerprint and os.path.exists(path)
+    except OSError:
+        return False
+
+def _write_chart(name, data, fingerprint=None):
+    """Build a chart and write it with its fingerprint sidecar. Returns
+    False, writing nothing, when there is nothing to chart."""
+    fig = CHARTS[name][1](data)
+    if fig is None:
+        return False
+    path, fingerprint_path = _chart_paths(name)
+    # Drop the old fingerprint first so an interrupted write is never
+    # mistaken for a current chart
+    Path(fingerprint_path).unlink(missing_ok=True)
+    fig.write_html(path, include_plotlyjs='cdn')
+    with open(fingerprint_path, 'w', encoding='utf-8') as f:
+        f.write(fingerprint or chart_fingerprint(name, data))
+    return True
+
+# Words counted for the benefits chart
+BENEFIT_KEYWORDS = [
+    'covers', 'benefits', 'exclusions', 'limitations',
+    'must', 'required', 'eligible', 'maximum',
+    'premium', 'insure', 'policy', 'claim'
+]
+
+def chart_data(simplified_text):
+    """Return {chart name: data} for the charts of a simplified policy text
+    (see enhanced_analyzer.render_simplified_text)."""
+    # Tokenized once for all the keyword and word charts
+    tokens = TokenStream(simplified_text)
+    numbers = extract_numbers(simplified_text)
+    if not numbers:
+        logger.warning("No valid numbers found in the text")
+    return {
+        'coverage': numbers[:5],
+        'benefits': count_keywords(simplified_text, BENEFIT_KEYWORDS, tokens),
+        'keyword_trends': keyword_trend_counts(tokens),
+        'word_cloud': word_frequencies(tokens)
+    }
+
+def build_figure_specs(charts):
+    """Return the Plotly JSON figure specs of {name: data} charts.
+
+    Returns {"charts": {name: spec}, "template": template}. The layout
+    template, several times larger than a chart itself and the same for
+    all of them, is sent once rather than in every spec; a chart with
+    nothing to show is None.
+    """
+    specs = {}
+    template = None
+    for name, data in charts.items():
+        fig = CHARTS[name][1](data)
+        if fig is None:
+            specs[name] = None
+            continue
+        spec = json.loads(fig.to_json())
+        template = spec["layout"].pop("template", template)
+        specs[name] = spec
+    return {"charts": specs, "template": template}
+
+def render_charts(charts, workers=None):
+    """Write the charts of {name: data} whose data changed since they were
+    last written, in parallel across a process pool.
+
+    Returns the names of the charts written; unchanged charts are left
+    untouched.
+    """
+    Path(STATIC_DIR).mkdir(exist_ok=True)
+    stale = {}
+    for name, data in charts.items():
+        fingerprint = chart_fingerprint(name, data)
+        if not chart_is_current(name, fingerprint):
+            stale[name] = fingerprint
+
+    workers = min(CHART_WORKERS if workers is None else workers, len(stale))
+    if workers <= 1:
+        return [name for name, fingerprint in stale.items() if _write_chart(name, charts[name], fingerprint)]
+    # Imported before the pool starts so forked workers inherit them rather
+    # than each paying for the import. Only each chart's (small) data
+    # crosses the process boundary; workers build and write the figures.
+    import pandas
+    import plotly.express
+    import plotly.graph_objects
+    import plotly.subplots
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {name: pool.submit(_write_chart, name, charts[name], fingerprint)
+                   for name, fingerprint in stale.items()}
+        return [name for name, future in futures.items() if future.result()]
 
 def generate_visualizations():
-    """Generate all visualizations from the policy document."""
-    # Create static directory if it doesn't exist
-    Path('static').mkdir(exist_ok=True)
-    
+    """Generate all visualizations from the policy document.
+
+    Charts whose data is unchanged since the last run are not rewritten.
+    """
     # Read the simplified text
     try:
         with open('simplified_text.txt', 'r', encoding='utf-8') as f:
@@ -367,23 +585,10 @@ def generate_visualizations():
         if not simplified_text.strip():
             raise ValueError("The simplified text file is empty")
             
-        # Extract data
-        numbers = extract_numbers(simplified_text)
-        if not numbers:
-            print("Warning: No valid numbers found in the text")
-            
-        keywords = count_keywords(simplified_text, [
-            'covers', 'benefits', 'exclusions', 'limitations',
-            'must', 'required', 'eligible', 'maximum',
-            'premium', 'insure', 'policy', 'claim'
-        ])
-        
         # Generate visualizations
-        create_coverage_chart(numbers)
-        create_benefits_chart(keywords)
-        create_keyword_trends(simplified_text)
-        create_word_cloud(simplified_text)
+        written = render_charts(chart_data(simplified_text))
         
+        print(f"{len(written)} of {len(CHARTS)} charts regenerated")
         print("Visualizations generated successfully!")
         
     except FileNotFoundError: